@@ -8,20 +8,145 @@ and provides ham radio solar data responses.
 
 import os
 import logging
-from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify
+import functools
+import orjson
+from flask import Flask, request, jsonify, current_app
+from flask.json.provider import DefaultJSONProvider
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from flask_cors import CORS
-from services.sms_service import SMSHandler
+from services.sms_service import bind_config, get_handler
 from models import RegistrationDatabase
-from config import Config
+from config import get_config
+from extensions import cache
 
+logger = logging.getLogger(__name__)
 
+# Deployment environment, read once at import time
+ENVIRONMENT = os.environ.get('ENVIRONMENT', 'production')
+
+# Timezone codes accepted by the propagation endpoints
+SUPPORTED_TIMEZONES = [
+    "EST", "EDT", "CST", "CDT", "MST", "MDT", "PST", "PDT",
+    "AKST", "AKDT", "HST", "AST", "ChST", "GST", "UTC", "GMT"
+]
+# Upper-cased lookup set so invalid codes are rejected before the service call
+VALID_TIMEZONES = frozenset(tz.upper() for tz in SUPPORTED_TIMEZONES)
+INVALID_TIMEZONE_MESSAGE = (
+    "Invalid timezone code '%s'. Supported codes: " + ", ".join(sorted(SUPPORTED_TIMEZONES))
+)
+INVALID_TIMEZONE_TEXT = (
+    "Invalid timezone code: %s\nSupported timezones: " + ", ".join(SUPPORTED_TIMEZONES)
+)
+
+
+# Fields required by the registration endpoints (A2P 10DLC compliance)
+REQUIRED_REGISTRATION_FIELDS = ('full_name', 'call_sign', 'phone_number', 'opted_in')
+REQUIRED_REGISTRATION_FIELD_SET = frozenset(REQUIRED_REGISTRATION_FIELDS)
+# Form values accepted as opted_in=True by the plain text registration endpoint
+TRUTHY_FORM_VALUES = frozenset({'true', '1', 'yes'})
+
+# Pre-serialized JSON bodies for responses whose content never changes
+REGISTER_MOVED = orjson.dumps({
+    "message": "Registration service moved to www.hampuff.com/register",
+    "status": "moved"
+})
+ERROR_INVALID_JSON = orjson.dumps({
+    "error": "Invalid request",
+    "message": "Request body must be JSON"
+})
+ERROR_MISSING_FIELDS_TEMPLATE = (
+    b'{"error":"Missing required fields","missing_fields":%s,"required_fields":'
+    + orjson.dumps(REQUIRED_REGISTRATION_FIELDS) + b'}'
+)
+ERROR_PROPAGATION = orjson.dumps({"error": "Failed to retrieve propagation data"})
+ERROR_UPDATE_FAILED = orjson.dumps({
+    "error": "Update failed",
+    "message": "Failed to update opt-in status"
+})
+ERROR_REGISTRATION = orjson.dumps({
+    "error": "Internal server error",
+    "message": "Failed to process registration"
+})
+ERROR_OPT_IN = orjson.dumps({
+    "error": "Internal server error",
+    "message": "Failed to process opt-in"
+})
+ERROR_OPT_OUT = orjson.dumps({
+    "error": "Internal server error",
+    "message": "Failed to process opt-out"
+})
+OPT_OUT_SUCCESS = orjson.dumps({
+    "status": "success",
+    "message": "User opted out successfully",
+    "opted_in": False
+})
+OPT_OUT_NOT_REGISTERED = orjson.dumps({
+    "status": "success",
+    "message": "Phone number not currently registered. No action needed.",
+    "opted_in": False
+})
+
+# Headers added to every response by the after_request hook
+SECURITY_HEADERS = (
+    ("X-Content-Type-Options", "nosniff"),
+    ("X-Frame-Options", "DENY"),
+)
+# Everything except successful GETs of the help and propagation endpoints
+# (SMS replies, registrations, health probes, errors) must not be reused;
+# Pragma and Expires cover HTTP/1.0 caches that ignore Cache-Control
+NO_STORE_HEADERS = (
+    ("Cache-Control", "no-store"),
+    ("Pragma", "no-cache"),
+    ("Expires", "0"),
+)
+
+
+def _json_response(body, status=200):
+    """Wrap pre-serialized JSON bytes in a response."""
+    return current_app.response_class(body, status=status, mimetype='application/json')
+
+
+def _propagation_cache_key():
+    """Cache key for propagation responses: endpoint plus timezone code."""
+    return f"{request.endpoint}:{request.view_args['timezone'].upper()}"
+
+
+def _is_cacheable(response):
+    """Only cache successful responses, never error tuples or 4xx/5xx."""
+    return getattr(response, 'status_code', None) == 200
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """JSON provider that uses orjson for serialization and parsing."""
+    
+    # Passed to every orjson.dumps call; allows non-string dict keys as the
+    # stdlib encoder does
+    option = orjson.OPT_NON_STR_KEYS
+    
+    def dumps(self, obj, **kwargs):
+        """Serialize data as a JSON string."""
+        return orjson.dumps(obj, default=self.default, option=self.option).decode()
+    
+    def loads(self, s, **kwargs):
+        """Deserialize data from a JSON string or bytes."""
+        return orjson.loads(s)
+    
+    def response(self, *args, **kwargs):
+        """Serialize the given arguments into a JSON response."""
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, default=self.default, option=self.option),
+            mimetype=self.mimetype
+        )
+
+
+@functools.lru_cache(maxsize=1)
 def get_version():
-    """Get the current application version."""
+    """Get the current application version (read once and cached)."""
     try:
         # Try to read version from environment-specific file first
-        env = os.environ.get('ENVIRONMENT', 'production')
+        env = ENVIRONMENT
         version_file = f"version.{env}.txt" if env in ['development', 'production'] else "version.txt"
         
         if os.path.exists(version_file):
@@ -36,10 +161,12 @@ def get_version():
         return "unknown"
 
 
-def create_app(config_class=Config):
+def create_app(config=None):
     """Application factory pattern for Flask app creation."""
     app = Flask(__name__)
-    app.config.from_object(config_class)
+    app.config.from_object(config if config is not None else get_config())
+    app.json = OrjsonProvider(app)
+    bind_config(app.config)
     
     # Enable sessions for flash messages
     app.secret_key = app.config.get('SECRET_KEY', 'dev-secret-key')
@@ -49,12 +176,15 @@ def create_app(config_class=Config):
         app=app,
         key_func=get_remote_address,
         default_limits=["200 per hour", "50 per minute"],
-        storage_uri="memory://",
+        storage_uri=app.config["RATELIMIT_STORAGE_URI"],
         strategy="fixed-window"
     )
     # Store limiter in app context for access in routes
     app.limiter = limiter
     
+    # Initialize response cache
+    cache.init_app(app)
+    
     # Initialize CORS for API endpoints
     CORS(app, resources={
         r"/sms/api/*": {
@@ -65,101 +195,112 @@ def create_app(config_class=Config):
     })
     
     # Initialize SMS handler and database
-    sms_handler = SMSHandler()
+    sms_handler = get_handler()
     db = RegistrationDatabase()
     
+    # Version and environment don't change while the process is running,
+    # so build the health payload once instead of on every probe
+    app.config["VERSION"] = get_version()
+    health_json = orjson.dumps({
+        "status": "healthy",
+        "service": "hampuff-sms",
+        "version": app.config["VERSION"],
+        "environment": ENVIRONMENT
+    })
+    
+    # The help text is static, so encode both API variants once
+    help_text = sms_handler._get_help_message()
+    help_text_bytes = help_text.encode()
+    help_json = orjson.dumps({
+        "help": help_text,
+        "format": "text",
+        "version": "v1"
+    })
+    
     @app.route("/health", methods=["GET"])
     def health_check():
         """Health check endpoint for monitoring."""
-        return {
-            "status": "healthy", 
-            "service": "hampuff-sms",
-            "version": get_version(),
-            "environment": os.environ.get('ENVIRONMENT', 'production')
-        }
+        return _json_response(health_json)
     
     @app.route("/sms", methods=["POST"])
     def sms_reply():
         """Handle incoming SMS requests from Twilio."""
-        return sms_handler.handle_sms_request()
+        return app.response_class(sms_handler.handle_sms_request(), mimetype='application/xml')
     
     @app.route("/register", methods=["GET", "POST"])
     def register():
         """Temporary registration endpoint - will be moved to main website."""
-        return {"message": "Registration service moved to www.hampuff.com/register", "status": "moved"}, 301
+        return _json_response(REGISTER_MOVED, 301)
     
     # JSON API endpoints
     @app.route("/sms/api/v1/help", methods=["GET"])
     @limiter.limit("100 per hour")
     def api_help():
         """JSON API help endpoint."""
-        logger = logging.getLogger(__name__)
-        try:
-            help_text = sms_handler._get_help_message()
-            return jsonify({
-                "help": help_text,
-                "format": "text",
-                "version": "v1"
-            })
-        except Exception as e:
-            logger.error(f"Error in API help endpoint: {str(e)}")
-            return jsonify({"error": "Failed to retrieve help information"}), 500
+        return _json_response(help_json)
     
-    @app.route("/sms/api/v1/propagation/<timezone>", methods=["GET"])
-    @app.route("/sms/api/v1/prop/<timezone>", methods=["GET"])
+    @app.route("/sms/api/v1/<any(propagation, prop):command>/<timezone>", methods=["GET"])
     @limiter.limit("100 per hour")
-    def api_propagation(timezone):
+    @cache.cached(
+        timeout=app.config["PROPAGATION_CACHE_TIMEOUT"],
+        key_prefix=_propagation_cache_key,
+        response_filter=_is_cacheable
+    )
+    def api_propagation(command, timezone):
         """JSON API propagation endpoint."""
-        logger = logging.getLogger(__name__)
+        tz_code = timezone.upper()
+        if tz_code not in VALID_TIMEZONES:
+            logger.warning("Invalid timezone requested: %s", timezone)
+            return jsonify({
+                "error": "Invalid timezone code",
+                "timezone": timezone,
+                "message": INVALID_TIMEZONE_MESSAGE % tz_code,
+                "supported_timezones": SUPPORTED_TIMEZONES
+            }), 400
+        
         try:
-            data = sms_handler.get_propagation_data_json(timezone.upper())
+            data = sms_handler.get_propagation_data_json(tz_code)
             return jsonify(data)
         except ValueError as e:
-            logger.warning(f"Invalid timezone requested: {timezone} - {str(e)}")
+            logger.warning("Invalid timezone requested: %s - %s", timezone, e)
             return jsonify({
                 "error": "Invalid timezone code",
                 "timezone": timezone,
                 "message": str(e),
-                "supported_timezones": [
-                    "EST", "EDT", "CST", "CDT", "MST", "MDT", "PST", "PDT",
-                    "AKST", "AKDT", "HST", "AST", "ChST", "GST", "UTC", "GMT"
-                ]
+                "supported_timezones": SUPPORTED_TIMEZONES
             }), 400
         except Exception as e:
-            logger.error(f"Error in API propagation endpoint: {str(e)}")
-            return jsonify({"error": "Failed to retrieve propagation data"}), 500
+            logger.error("Error in API propagation endpoint: %s", e)
+            return _json_response(ERROR_PROPAGATION, 500)
     
     # Plain text (cURL-friendly) API endpoints
     @app.route("/sms/curl/v1/help", methods=["GET"])
     @limiter.limit("100 per hour")
     def curl_help():
         """Plain text help endpoint for cURL."""
-        logger = logging.getLogger(__name__)
-        try:
-            help_text = sms_handler._get_help_message()
-            response = app.response_class(
-                response=help_text,
-                status=200,
-                mimetype='text/plain'
-            )
-            return response
-        except Exception as e:
-            logger.error(f"Error in curl help endpoint: {str(e)}")
-            return app.response_class(
-                response=f"Error: Failed to retrieve help information\n{str(e)}",
-                status=500,
-                mimetype='text/plain'
-            )
+        return app.response_class(help_text_bytes, mimetype='text/plain')
     
-    @app.route("/sms/curl/v1/propagation/<timezone>", methods=["GET"])
-    @app.route("/sms/curl/v1/prop/<timezone>", methods=["GET"])
+    @app.route("/sms/curl/v1/<any(propagation, prop):command>/<timezone>", methods=["GET"])
     @limiter.limit("100 per hour")
-    def curl_propagation(timezone):
+    @cache.cached(
+        timeout=app.config["PROPAGATION_CACHE_TIMEOUT"],
+        key_prefix=_propagation_cache_key,
+        response_filter=_is_cacheable
+    )
+    def curl_propagation(command, timezone):
         """Plain text propagation endpoint for cURL (matches SMS format)."""
-        logger = logging.getLogger(__name__)
+        tz_code = timezone.upper()
+        if tz_code not in VALID_TIMEZONES:
+            logger.warning("Invalid timezone requested: %s", timezone)
+            return app.response_class(
+                response=INVALID_TIMEZONE_TEXT % timezone,
+                status=400,
+                mimetype='text/plain'
+            )
+        
         try:
             # Get propagation data (same format as SMS, without consent message)
-            data = sms_handler.get_propagation_data(timezone.upper(), include_consent=False)
+            data = sms_handler.get_propagation_data(tz_code, include_consent=False)
             response = app.response_class(
                 response=data,
                 status=200,
@@ -167,19 +308,14 @@ def create_app(config_class=Config):
             )
             return response
         except ValueError as e:
-            logger.warning(f"Invalid timezone requested: {timezone} - {str(e)}")
-            error_msg = (
-                f"Invalid timezone code: {timezone}\n"
-                f"Supported timezones: EST, EDT, CST, CDT, MST, MDT, PST, PDT, "
-                f"AKST, AKDT, HST, AST, ChST, GST, UTC, GMT"
-            )
+            logger.warning("Invalid timezone requested: %s - %s", timezone, e)
             return app.response_class(
-                response=error_msg,
+                response=INVALID_TIMEZONE_TEXT % timezone,
                 status=400,
                 mimetype='text/plain'
             )
         except Exception as e:
-            logger.error(f"Error in curl propagation endpoint: {str(e)}")
+            logger.error("Error in curl propagation endpoint: %s", e)
             return app.response_class(
                 response=f"Error: Failed to retrieve propagation data\n{str(e)}",
                 status=500,
@@ -191,25 +327,19 @@ def create_app(config_class=Config):
     @limiter.limit("10 per hour")
     def api_register():
         """Register a new user via API (requires all fields for A2P 10DLC compliance)."""
-        logger = logging.getLogger(__name__)
         try:
-            data = request.get_json()
+            data = request.get_json(silent=True)
             
-            if not data:
-                return jsonify({
-                    "error": "Invalid request",
-                    "message": "Request body must be JSON"
-                }), 400
+            if not data or not isinstance(data, dict):
+                return _json_response(ERROR_INVALID_JSON, 400)
             
             # Validate required fields
-            required_fields = ['full_name', 'call_sign', 'phone_number', 'opted_in']
-            missing_fields = [field for field in required_fields if field not in data]
-            if missing_fields:
-                return jsonify({
-                    "error": "Missing required fields",
-                    "missing_fields": missing_fields,
-                    "required_fields": required_fields
-                }), 400
+            missing = REQUIRED_REGISTRATION_FIELD_SET - data.keys()
+            if missing:
+                missing_fields = [f for f in REQUIRED_REGISTRATION_FIELDS if f in missing]
+                return _json_response(
+                    ERROR_MISSING_FIELDS_TEMPLATE % orjson.dumps(missing_fields), 400
+                )
             
             # Get IP address and user agent
             ip_address = request.remote_addr
@@ -225,7 +355,8 @@ def create_app(config_class=Config):
                     ip_address=ip_address,
                     user_agent=user_agent
                 )
-                logger.info(f"API registration successful: {result['phone_normalized']}")
+                sms_handler.forget_opt_in(result['phone_normalized'])
+                logger.info("API registration successful: %s", result['phone_normalized'])
                 return jsonify({
                     "status": "success",
                     "message": "Registration successful",
@@ -236,25 +367,20 @@ def create_app(config_class=Config):
                     }
                 }), 201
             except ValueError as e:
-                logger.warning(f"API registration failed: {str(e)}")
+                logger.warning("API registration failed: %s", e)
                 return jsonify({
                     "error": "Registration failed",
                     "message": str(e)
                 }), 400
                 
         except Exception as e:
-            logger.error(f"Error in API registration endpoint: {str(e)}")
-            return jsonify({
-                "error": "Internal server error",
-                "message": "Failed to process registration"
-            }), 500
+            logger.error("Error in API registration endpoint: %s", e)
+            return _json_response(ERROR_REGISTRATION, 500)
     
-    @app.route("/sms/api/v1/start/<phone_number>", methods=["POST"])
-    @app.route("/sms/api/v1/register/<phone_number>", methods=["POST"])
+    @app.route("/sms/api/v1/<any(start, register):command>/<phone_number>", methods=["POST"])
     @limiter.limit("20 per hour")
-    def api_start(phone_number):
+    def api_start(command, phone_number):
         """Opt-in an already registered user via API."""
-        logger = logging.getLogger(__name__)
         try:
             # Check if user exists
             user = db.get_user_by_phone(phone_number)
@@ -267,8 +393,9 @@ def create_app(config_class=Config):
             
             # Opt them in
             success = db.update_opt_in_status(phone_number, True)
+            sms_handler.forget_opt_in(phone_number)
             if success:
-                logger.info(f"API opt-in successful: {phone_number}")
+                logger.info("API opt-in successful: %s", phone_number)
                 return jsonify({
                     "status": "success",
                     "message": "User opted in successfully",
@@ -276,67 +403,48 @@ def create_app(config_class=Config):
                     "opted_in": True
                 }), 200
             else:
-                return jsonify({
-                    "error": "Update failed",
-                    "message": "Failed to update opt-in status"
-                }), 500
+                return _json_response(ERROR_UPDATE_FAILED, 500)
                 
         except Exception as e:
-            logger.error(f"Error in API opt-in endpoint: {str(e)}")
-            return jsonify({
-                "error": "Internal server error",
-                "message": "Failed to process opt-in"
-            }), 500
+            logger.error("Error in API opt-in endpoint: %s", e)
+            return _json_response(ERROR_OPT_IN, 500)
     
-    @app.route("/sms/api/v1/stop/<phone_number>", methods=["POST"])
-    @app.route("/sms/api/v1/unregister/<phone_number>", methods=["POST"])
+    @app.route("/sms/api/v1/<any(stop, unregister):command>/<phone_number>", methods=["POST"])
     @limiter.limit("20 per hour")
-    def api_stop(phone_number):
+    def api_stop(command, phone_number):
         """Opt-out a user via API."""
-        logger = logging.getLogger(__name__)
         try:
             # Try to opt them out (works even if not registered)
             success = db.update_opt_in_status(phone_number, False)
+            sms_handler.forget_opt_in(phone_number)
             if success:
-                logger.info(f"API opt-out successful: {phone_number}")
-                return jsonify({
-                    "status": "success",
-                    "message": "User opted out successfully",
-                    "opted_in": False
-                }), 200
+                logger.info("API opt-out successful: %s", phone_number)
+                return _json_response(OPT_OUT_SUCCESS)
             else:
                 # User not found, but we'll still confirm
-                logger.info(f"API opt-out requested for unregistered number: {phone_number}")
-                return jsonify({
-                    "status": "success",
-                    "message": "Phone number not currently registered. No action needed.",
-                    "opted_in": False
-                }), 200
+                logger.info("API opt-out requested for unregistered number: %s", phone_number)
+                return _json_response(OPT_OUT_NOT_REGISTERED)
                 
         except Exception as e:
-            logger.error(f"Error in API opt-out endpoint: {str(e)}")
-            return jsonify({
-                "error": "Internal server error",
-                "message": "Failed to process opt-out"
-            }), 500
+            logger.error("Error in API opt-out endpoint: %s", e)
+            return _json_response(ERROR_OPT_OUT, 500)
     
     # Registration API endpoints (Plain text / cURL)
     @app.route("/sms/curl/v1/register", methods=["POST"])
     @limiter.limit("10 per hour")
     def curl_register():
         """Register a new user via plain text API."""
-        logger = logging.getLogger(__name__)
         try:
             # Accept both JSON and form data
             if request.is_json:
-                data = request.get_json()
+                data = request.get_json(silent=True)
             else:
                 data = request.form.to_dict()
                 # Convert opted_in from string to bool
                 if 'opted_in' in data:
-                    data['opted_in'] = data['opted_in'].lower() in ['true', '1', 'yes']
+                    data['opted_in'] = data['opted_in'].lower() in TRUTHY_FORM_VALUES
             
-            if not data:
+            if not data or not isinstance(data, dict):
                 return app.response_class(
                     response="Error: Invalid request - no data provided",
                     status=400,
@@ -344,9 +452,9 @@ def create_app(config_class=Config):
                 )
             
             # Validate required fields
-            required_fields = ['full_name', 'call_sign', 'phone_number', 'opted_in']
-            missing_fields = [field for field in required_fields if field not in data]
-            if missing_fields:
+            missing = REQUIRED_REGISTRATION_FIELD_SET - data.keys()
+            if missing:
+                missing_fields = [f for f in REQUIRED_REGISTRATION_FIELDS if f in missing]
                 return app.response_class(
                     response=f"Error: Missing required fields: {', '.join(missing_fields)}",
                     status=400,
@@ -367,14 +475,15 @@ def create_app(config_class=Config):
                     ip_address=ip_address,
                     user_agent=user_agent
                 )
-                logger.info(f"cURL registration successful: {result['phone_normalized']}")
+                sms_handler.forget_opt_in(result['phone_normalized'])
+                logger.info("cURL registration successful: %s", result['phone_normalized'])
                 return app.response_class(
                     response=f"Registration successful\nPhone: {result['phone_normalized']}\nOpted in: {result['opted_in']}",
                     status=201,
                     mimetype='text/plain'
                 )
             except ValueError as e:
-                logger.warning(f"cURL registration failed: {str(e)}")
+                logger.warning("cURL registration failed: %s", e)
                 return app.response_class(
                     response=f"Error: {str(e)}",
                     status=400,
@@ -382,19 +491,17 @@ def create_app(config_class=Config):
                 )
                 
         except Exception as e:
-            logger.error(f"Error in cURL registration endpoint: {str(e)}")
+            logger.error("Error in cURL registration endpoint: %s", e)
             return app.response_class(
                 response=f"Error: Failed to process registration\n{str(e)}",
                 status=500,
                 mimetype='text/plain'
             )
     
-    @app.route("/sms/curl/v1/start/<phone_number>", methods=["POST"])
-    @app.route("/sms/curl/v1/register/<phone_number>", methods=["POST"])
+    @app.route("/sms/curl/v1/<any(start, register):command>/<phone_number>", methods=["POST"])
     @limiter.limit("20 per hour")
-    def curl_start(phone_number):
+    def curl_start(command, phone_number):
         """Opt-in an already registered user via plain text API."""
-        logger = logging.getLogger(__name__)
         try:
             # Check if user exists
             user = db.get_user_by_phone(phone_number)
@@ -407,8 +514,9 @@ def create_app(config_class=Config):
             
             # Opt them in
             success = db.update_opt_in_status(phone_number, True)
+            sms_handler.forget_opt_in(phone_number)
             if success:
-                logger.info(f"cURL opt-in successful: {phone_number}")
+                logger.info("cURL opt-in successful: %s", phone_number)
                 return app.response_class(
                     response=f"User opted in successfully\nPhone: {user.get('phone_normalized')}\nOpted in: True",
                     status=200,
@@ -422,24 +530,23 @@ def create_app(config_class=Config):
                 )
                 
         except Exception as e:
-            logger.error(f"Error in cURL opt-in endpoint: {str(e)}")
+            logger.error("Error in cURL opt-in endpoint: %s", e)
             return app.response_class(
                 response=f"Error: Failed to process opt-in\n{str(e)}",
                 status=500,
                 mimetype='text/plain'
             )
     
-    @app.route("/sms/curl/v1/stop/<phone_number>", methods=["POST"])
-    @app.route("/sms/curl/v1/unregister/<phone_number>", methods=["POST"])
+    @app.route("/sms/curl/v1/<any(stop, unregister):command>/<phone_number>", methods=["POST"])
     @limiter.limit("20 per hour")
-    def curl_stop(phone_number):
+    def curl_stop(command, phone_number):
         """Opt-out a user via plain text API."""
-        logger = logging.getLogger(__name__)
         try:
             # Try to opt them out (works even if not registered)
             success = db.update_opt_in_status(phone_number, False)
+            sms_handler.forget_opt_in(phone_number)
             if success:
-                logger.info(f"cURL opt-out successful: {phone_number}")
+                logger.info("cURL opt-out successful: %s", phone_number)
                 return app.response_class(
                     response="User opted out successfully\nOpted in: False",
                     status=200,
@@ -447,7 +554,7 @@ def create_app(config_class=Config):
                 )
             else:
                 # User not found, but we'll still confirm
-                logger.info(f"cURL opt-out requested for unregistered number: {phone_number}")
+                logger.info("cURL opt-out requested for unregistered number: %s", phone_number)
                 return app.response_class(
                     response="Phone number not currently registered. No action needed.",
                     status=200,
@@ -455,27 +562,40 @@ def create_app(config_class=Config):
                 )
                 
         except Exception as e:
-            logger.error(f"Error in cURL opt-out endpoint: {str(e)}")
+            logger.error("Error in cURL opt-out endpoint: %s", e)
             return app.response_class(
                 response=f"Error: Failed to process opt-out\n{str(e)}",
                 status=500,
                 mimetype='text/plain'
             )
     
+    # Read-only endpoints clients may cache, with their max-age in seconds
+    cacheable_endpoints = {
+        "api_help": app.config["CACHE_DEFAULT_TIMEOUT"],
+        "curl_help": app.config["CACHE_DEFAULT_TIMEOUT"],
+        "api_propagation": app.config["PROPAGATION_CACHE_TIMEOUT"],
+        "curl_propagation": app.config["PROPAGATION_CACHE_TIMEOUT"],
+    }
+    
     @app.after_request
     def add_security_headers(response):
-        """Add security headers to all responses."""
-        response.headers["Cache-Control"] = "no-cache, no-store, must-revalidate, public, max-age=0"
-        response.headers["Expires"] = "0"
-        response.headers["Pragma"] = "no-cache"
-        response.headers["X-Content-Type-Options"] = "nosniff"
-        response.headers["X-Frame-Options"] = "DENY"
+        """Add security and caching headers to all responses."""
+        response.headers.update(SECURITY_HEADERS)
+        max_age = cacheable_endpoints.get(request.endpoint)
+        if max_age is not None and request.method == "GET" and response.status_code == 200:
+            # Let clients revalidate with If-None-Match and get a bodiless 304
+            response.cache_control.public = True
+            response.cache_control.max_age = max_age
+            response.add_etag()
+            return response.make_conditional(request)
+        response.headers.update(NO_STORE_HEADERS)
         return response
     
     return app
 
 
 if __name__ == "__main__":
+    # Werkzeug development server only; production uses Gunicorn via wsgi.py
     app = create_app()
     app.run(
         host=app.config["HOST"],
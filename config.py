@@ -3,62 +3,83 @@
 Configuration settings for the Hampuff SMS Web Service.
 """
 
+import functools
 import os
+from dataclasses import dataclass
+from typing import Optional
 
 
+@dataclass(frozen=True)
 class Config:
-    """Base configuration class."""
-    
+    """Application configuration; use get_config() for the environment-derived instance."""
+
     # Flask settings
-    SECRET_KEY = os.environ.get("SECRET_KEY") or "dev-secret-key-change-in-production"
-    DEBUG = os.environ.get("FLASK_DEBUG", "false").lower() == "true"
-    
+    SECRET_KEY: str = "dev-secret-key-change-in-production"
+    DEBUG: bool = False
+
     # Server settings
-    HOST = os.environ.get("HOST", "0.0.0.0")
-    PORT = int(os.environ.get("PORT", 15015))
-    
+    HOST: str = "0.0.0.0"
+    PORT: int = 15015
+
     # Twilio settings (for future use if needed)
-    TWILIO_ACCOUNT_SID = os.environ.get("TWILIO_ACCOUNT_SID", "put_your_account_sid_here")
-    TWILIO_AUTH_TOKEN = os.environ.get("TWILIO_AUTH_TOKEN", "put_your_auth_token_here")
-    
+    TWILIO_ACCOUNT_SID: str = "put_your_account_sid_here"
+    TWILIO_AUTH_TOKEN: str = "put_your_auth_token_here"
+
     # Application settings
-    CONSENT_MESSAGE = "Your SMS request provides consent to send the reply."
-    AIRPUFF_MESSAGE = (
+    CONSENT_MESSAGE: str = "Your SMS request provides consent to send the reply."
+    AIRPUFF_MESSAGE: str = (
         "Wrong number. That might be an airport so please text Airpuff "
         "at sms://+1-802-247-7833 / [802-AIR-PUFF]"
     )
-    DEFAULT_WRONG_NUMBER_MESSAGE = "Wrong number. Please waste someone else's time."
-    
-    # Database settings
-    REGISTRATION_DB_PATH = os.environ.get("REGISTRATION_DB_PATH", "/opt/hampuff-data/registrations.db")
-    
-    # Logging
-    LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO")
+    DEFAULT_WRONG_NUMBER_MESSAGE: str = "Wrong number. Please waste someone else's time."
 
+    # Rate limiter storage; point at Redis (e.g. redis://localhost:6379/0) so
+    # counters are shared by all gunicorn workers instead of kept per process
+    RATELIMIT_STORAGE_URI: str = "memory://"
 
-class DevelopmentConfig(Config):
-    """Development configuration."""
-    DEBUG = True
-    LOG_LEVEL = "DEBUG"
+    # Response cache; use RedisCache (with CACHE_REDIS_URL) so entries are
+    # shared by all gunicorn workers
+    CACHE_TYPE: str = "SimpleCache"
+    CACHE_REDIS_URL: Optional[str] = None
+    CACHE_DEFAULT_TIMEOUT: int = 300
+    PROPAGATION_CACHE_TIMEOUT: int = 300
+    # How long an SMS sender's "not opted in" status is reused before
+    # re-reading the database; opted-in senders are always checked against the
+    # database, so opt-outs take effect immediately in every worker
+    OPT_IN_CACHE_TIMEOUT: int = 60
 
+    # Database settings
+    REGISTRATION_DB_PATH: str = "/opt/hampuff-data/registrations.db"
 
-class ProductionConfig(Config):
-    """Production configuration."""
-    DEBUG = False
-    LOG_LEVEL = "WARNING"
+    # Logging
+    LOG_LEVEL: str = "INFO"
 
 
-class TestingConfig(Config):
-    """Testing configuration."""
-    TESTING = True
-    DEBUG = True
-    LOG_LEVEL = "DEBUG"
+@functools.lru_cache(maxsize=1)
+def get_config() -> Config:
+    """
+    Build the application configuration from environment variables.
 
+    The environment is read on the first call only; later calls return the
+    same frozen instance.
 
-# Configuration mapping
-config = {
-    "development": DevelopmentConfig,
-    "production": ProductionConfig,
-    "testing": TestingConfig,
-    "default": DevelopmentConfig
-}
+    Returns:
+        Config populated from the environment, falling back to the defaults
+    """
+    env = os.environ
+    return Config(
+        SECRET_KEY=env.get("SECRET_KEY") or Config.SECRET_KEY,
+        DEBUG=env.get("FLASK_DEBUG", "false").lower() == "true",
+        HOST=env.get("HOST", Config.HOST),
+        PORT=int(env.get("PORT", Config.PORT)),
+        TWILIO_ACCOUNT_SID=env.get("TWILIO_ACCOUNT_SID", Config.TWILIO_ACCOUNT_SID),
+        TWILIO_AUTH_TOKEN=env.get("TWILIO_AUTH_TOKEN", Config.TWILIO_AUTH_TOKEN),
+        RATELIMIT_STORAGE_URI=env.get("RATELIMIT_STORAGE_URI", Config.RATELIMIT_STORAGE_URI),
+        CACHE_TYPE=env.get("CACHE_TYPE", Config.CACHE_TYPE),
+        CACHE_REDIS_URL=env.get("CACHE_REDIS_URL"),
+        CACHE_DEFAULT_TIMEOUT=int(env.get("CACHE_DEFAULT_TIMEOUT", Config.CACHE_DEFAULT_TIMEOUT)),
+        PROPAGATION_CACHE_TIMEOUT=int(env.get("PROPAGATION_CACHE_TIMEOUT", Config.PROPAGATION_CACHE_TIMEOUT)),
+        OPT_IN_CACHE_TIMEOUT=int(env.get("OPT_IN_CACHE_TIMEOUT", Config.OPT_IN_CACHE_TIMEOUT)),
+        REGISTRATION_DB_PATH=env.get("REGISTRATION_DB_PATH", Config.REGISTRATION_DB_PATH),
+        LOG_LEVEL=env.get("LOG_LEVEL", Config.LOG_LEVEL).upper(),
+    )
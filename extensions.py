@@ -0,0 +1,12 @@
+#!/usr/bin/env python3
+"""
+Flask extension instances shared by the Hampuff SMS Web Service.
+
+Extensions are created unbound here and attached to the application in
+create_app(), so other modules can import them without circular imports.
+"""
+
+from flask_caching import Cache
+
+
+cache = Cache()
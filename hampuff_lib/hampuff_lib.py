@@ -8,12 +8,68 @@ with the latest ham radio conditions update.
 
 import datetime
 import logging
+import threading
+import time
 import pytz
 import requests
-import xmltodict
+from xml.etree import ElementTree
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from typing import Optional
 
 
+# hamqsl.com publishes new solar data roughly hourly, so a parsed result is
+# shared by all providers for a few minutes instead of refetched per SMS
+SOLAR_CACHE_TTL = 180
+# Seconds after a failed download before another is attempted; meanwhile
+# requests get the last good data, or fail fast if there is none
+SOLAR_RETRY_BACKOFF = 30
+_solar_cache = {'data': None, 'ts': 0.0, 'failed_ts': None, 'refreshing': False}
+_solar_cache_lock = threading.Lock()
+# Signalled when an in-flight download finishes, for requests with no data yet
+_solar_refreshed = threading.Condition(_solar_cache_lock)
+
+# Formatted SMS reports keyed by (updated, timezone). Every request for a zone
+# between hamqsl updates gets the same text; the cache is emptied when a new
+# report arrives, so it holds at most one entry per timezone
+_report_cache = {}
+
+# Month abbreviations used in hamqsl's 'updated' timestamps
+_MONTHS = {
+    name: number for number, name in enumerate(
+        ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'),
+        start=1
+    )
+}
+
+# solardata fields read by the SMS and JSON responses; the rest of the feed
+# is ignored when parsing
+SOLAR_FIELDS = ('updated', 'solarflux', 'aindex', 'kindex', 'sunspots', 'muf', 'xray', 'solarwind')
+
+
+def clear_solar_cache() -> None:
+    """Discard the cached solar data so the next request refetches it."""
+    with _solar_cache_lock:
+        _solar_cache['data'] = None
+        _solar_cache['ts'] = 0.0
+        _solar_cache['failed_ts'] = None
+        _report_cache.clear()
+
+
+def _create_session() -> requests.Session:
+    """Create the keep-alive HTTP session used for hamqsl.com fetches."""
+    session = requests.Session()
+    session.headers['User-Agent'] = HampuffDataProvider.USER_AGENT
+    adapter = HTTPAdapter(
+        pool_connections=10,
+        pool_maxsize=50,
+        max_retries=Retry(total=2, backoff_factor=0.1, status_forcelist=(500, 502, 503, 504))
+    )
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
 class HampuffDataProvider:
     """Provides hampuff data by fetching and parsing solar data from hamqsl.com."""
     
@@ -45,12 +101,15 @@ class HampuffDataProvider:
         'UTC': pytz.UTC,  # Coordinated Universal Time
         'GMT': pytz.UTC,  # Greenwich Mean Time (same as UTC)
     }
+    # Case-insensitive lookup table and error-message code list, built once
+    TIMEZONE_MAP_UPPER = {k.upper(): v for k, v in TIMEZONE_MAP.items()}
+    SUPPORTED_CODES = ', '.join(sorted(TIMEZONE_MAP))
+    # Display label per zone ('US/Eastern' -> 'Eastern'), computed once
+    TZ_DISPLAY = {tz: str(tz).split('/')[-1] for tz in TIMEZONE_MAP.values()}
     
     def __init__(self):
         """Initialize the hampuff data provider."""
         self.logger = logging.getLogger(__name__)
-        self._solar_data = None
-        self._last_update = None
     
     def get_hampuff_data(self, hampuff_args: str) -> str:
         """
@@ -79,7 +138,7 @@ class HampuffDataProvider:
             return self._format_hampuff_response(solar_data, timezone)
             
         except Exception as e:
-            self.logger.error(f"Error getting hampuff data: {str(e)}")
+            self.logger.error("Error getting hampuff data: %s", e)
             raise
     
     def get_hampuff_data_for_timezone(self, timezone_code: str) -> str:
@@ -106,7 +165,7 @@ class HampuffDataProvider:
             return self._format_hampuff_response(solar_data, timezone)
             
         except Exception as e:
-            self.logger.error(f"Error getting hampuff data: {str(e)}")
+            self.logger.error("Error getting hampuff data: %s", e)
             raise
     
     def _get_timezone_from_code(self, timezone_code: str) -> pytz.timezone:
@@ -122,23 +181,13 @@ class HampuffDataProvider:
         Raises:
             ValueError: If timezone code is not supported
         """
-        # Try exact match first (for codes like 'ChST' that have mixed case)
-        if timezone_code in self.TIMEZONE_MAP:
-            return self.TIMEZONE_MAP[timezone_code]
+        timezone = self.TIMEZONE_MAP_UPPER.get(timezone_code.upper())
+        if timezone is not None:
+            return timezone
         
-        # Try uppercase match for case-insensitive lookup
-        code_upper = timezone_code.upper()
-        # Create a case-insensitive lookup map
-        upper_map = {k.upper(): v for k, v in self.TIMEZONE_MAP.items()}
-        
-        if code_upper in upper_map:
-            return upper_map[code_upper]
-        
-        # Not found
-        valid_codes = ', '.join(sorted(self.TIMEZONE_MAP.keys()))
         raise ValueError(
             f"Invalid timezone code '{timezone_code}'. "
-            f"Supported codes: {valid_codes}"
+            f"Supported codes: {self.SUPPORTED_CODES}"
         )
     
     def _validate_hampuff_args(self, hampuff_args: str) -> None:
@@ -157,48 +206,114 @@ class HampuffDataProvider:
         timezone_char = hampuff_args[7].lower()
         
         if timezone_char == 'e':
-            return pytz.timezone('US/Eastern')
+            return self.TIMEZONE_MAP['EST']
         elif timezone_char == 'p':
-            return pytz.timezone('US/Pacific')
+            return self.TIMEZONE_MAP['PST']
         else:
             raise ValueError(
                 "Invalid timezone. Only 'e' (Eastern) and 'p' (Pacific) are supported"
             )
     
     def _fetch_solar_data(self) -> dict:
-        """Fetch solar data from hamqsl.com."""
+        """
+        Fetch solar data from hamqsl.com, reusing a result younger than SOLAR_CACHE_TTL.
+        
+        Only one request downloads at a time, outside the lock. Others keep
+        serving the previous data meanwhile, and keep serving it for
+        SOLAR_RETRY_BACKOFF seconds after a failed download.
+        """
+        data = _solar_cache['data']
+        if data is not None and time.monotonic() - _solar_cache['ts'] < SOLAR_CACHE_TTL:
+            return data
+        
+        with _solar_cache_lock:
+            # Nothing cached yet: wait for a download already in progress
+            # rather than starting another
+            _solar_refreshed.wait_for(
+                lambda: _solar_cache['data'] is not None or not _solar_cache['refreshing']
+            )
+            data = _solar_cache['data']
+            now = time.monotonic()
+            if data is not None and now - _solar_cache['ts'] < SOLAR_CACHE_TTL:
+                return data
+            failed_ts = _solar_cache['failed_ts']
+            backing_off = failed_ts is not None and now - failed_ts < SOLAR_RETRY_BACKOFF
+            if _solar_cache['refreshing'] or backing_off:
+                if data is None:
+                    raise ValueError("Solar data temporarily unavailable")
+                return data
+            _solar_cache['refreshing'] = True
+        
         try:
-            headers = {'User-Agent': self.USER_AGENT}
-            response = requests.get(self.BASE_URL, headers=headers, timeout=10)
+            fresh = self._download_solar_data()
+        except Exception:
+            with _solar_cache_lock:
+                _solar_cache['refreshing'] = False
+                _solar_cache['failed_ts'] = time.monotonic()
+                _solar_refreshed.notify_all()
+            if data is None:
+                raise
+            self.logger.warning("Solar data refresh failed; serving the previous update")
+            return data
+        
+        with _solar_cache_lock:
+            if data is None or data.get('updated') != fresh.get('updated'):
+                _report_cache.clear()
+            _solar_cache['data'] = fresh
+            _solar_cache['ts'] = time.monotonic()
+            _solar_cache['failed_ts'] = None
+            _solar_cache['refreshing'] = False
+            _solar_refreshed.notify_all()
+        return fresh
+    
+    def _download_solar_data(self) -> dict:
+        """Download and parse solar data from hamqsl.com."""
+        try:
+            response = _SESSION.get(self.BASE_URL, timeout=10)
             response.raise_for_status()
             
-            # Parse XML response
-            solar_data = xmltodict.parse(response.text)
+            # Parse the raw bytes; the parser reads the encoding from the XML
+            # declaration, so there's no need to decode response.text first
+            root = ElementTree.fromstring(response.content)
             
             # Validate response structure
-            if 'solar' not in solar_data or 'solardata' not in solar_data['solar']:
+            solardata = root.find('solardata') if root.tag == 'solar' else None
+            if solardata is None:
                 raise ValueError("Invalid solar data response structure")
             
-            return solar_data['solar']['solardata']
+            # Keep only the fields we report, skipping any missing from the feed
+            solar_data = {}
+            for field in SOLAR_FIELDS:
+                element = solardata.find(field)
+                if element is not None:
+                    # hamqsl pads some values with spaces; empty elements read as None
+                    text = (element.text or '').strip()
+                    solar_data[field] = text or None
+            return solar_data
             
         except requests.RequestException as e:
-            self.logger.error(f"Error fetching solar data: {str(e)}")
+            self.logger.error("Error fetching solar data: %s", e)
             raise ValueError(f"Failed to fetch solar data: {str(e)}")
         except Exception as e:
-            self.logger.error(f"Error parsing solar data: {str(e)}")
+            self.logger.error("Error parsing solar data: %s", e)
             raise ValueError(f"Failed to parse solar data: {str(e)}")
     
     def _format_hampuff_response(self, solar_data: dict, timezone: pytz.timezone) -> str:
-        """Format the hampuff response with solar data."""
+        """Format the hampuff response with solar data, reusing it until the next update."""
         try:
+            key = (solar_data['updated'], timezone)
+            report = _report_cache.get(key)
+            if report is not None:
+                return report
+            
             # Parse update time
             update_time = self._parse_update_time(solar_data['updated'], timezone)
             
             # Get timezone name for display (use the zone name)
-            tz_name = str(timezone).split('/')[-1] if '/' in str(timezone) else str(timezone)
+            tz_name = self.TZ_DISPLAY[timezone]
             
             # Format the response
-            response = (
+            report = (
                 f"[Hampuff - {tz_name}] Updated: {update_time}\n"
                 f"\tSolar Flux  = {solar_data.get('solarflux', 'N/A')}\n"
                 f"\tA Index     = {solar_data.get('aindex', 'N/A')}\n"
@@ -208,19 +323,26 @@ class HampuffDataProvider:
                 f"\tXRay        = {solar_data.get('xray', 'N/A')}\n"
                 f"\tSolar Winds = {solar_data.get('solarwind', 'N/A')}"
             )
-            
-            return response
+            _report_cache[key] = report
+            return report
             
         except KeyError as e:
-            self.logger.error(f"Missing solar data field: {str(e)}")
+            self.logger.error("Missing solar data field: %s", e)
             raise ValueError(f"Solar data is incomplete: missing {str(e)}")
     
     def _parse_update_time(self, update_str: str, timezone: pytz.timezone) -> str:
         """Parse and format the update time in the specified timezone."""
         try:
-            # Parse the time format from hamqsl
-            time_format = '%d %b %Y %H%M %Z'
-            utc_time = datetime.datetime.strptime(update_str, time_format).replace(
+            # Parse the hamqsl time format ('15 Oct 2026 1200 GMT') by hand;
+            # it always uses English month names, so strptime isn't needed
+            day, month, year, hhmm, _zone = update_str.split()
+            if len(hhmm) != 4:
+                raise ValueError(f"bad time {hhmm!r}")
+            month_num = _MONTHS.get(month.title())
+            if month_num is None:
+                raise ValueError(f"bad month {month!r}")
+            utc_time = datetime.datetime(
+                int(year), month_num, int(day), int(hhmm[:2]), int(hhmm[2:]),
                 tzinfo=datetime.timezone.utc
             )
             
@@ -232,10 +354,38 @@ class HampuffDataProvider:
             return local_time.strftime(output_format)
             
         except ValueError as e:
-            self.logger.error(f"Error parsing update time: {str(e)}")
+            self.logger.error("Error parsing update time: %s", e)
             raise ValueError(f"Invalid update time format: {str(e)}")
 
 
+# One session per process, shared by every provider, so repeated fetches
+# reuse the upstream keep-alive connection
+_SESSION = _create_session()
+
+
+_provider = None
+_provider_lock = threading.Lock()
+
+
+def get_provider() -> HampuffDataProvider:
+    """
+    Get the shared HampuffDataProvider instance.
+    
+    The HTTP session and the solar and report caches are module-level, so
+    providers hold no per-instance state; one instance is shared instead of
+    building a new provider for every caller.
+    
+    Returns:
+        Process-wide HampuffDataProvider
+    """
+    global _provider
+    if _provider is None:
+        with _provider_lock:
+            if _provider is None:
+                _provider = HampuffDataProvider()
+    return _provider
+
+
 # Legacy function for backward compatibility
 def hampuff_data(hampuff_args: str) -> str:
     """
@@ -247,5 +397,4 @@ def hampuff_data(hampuff_args: str) -> str:
     Returns:
         Formatted string with solar data
     """
-    provider = HampuffDataProvider()
-    return provider.get_hampuff_data(hampuff_args)
\ No newline at end of file
+    return get_provider().get_hampuff_data(hampuff_args)
\ No newline at end of file
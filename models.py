@@ -3,25 +3,106 @@
 Database models for the Hampuff SMS registration system.
 """
 
+import functools
+import re
+import queue
 import sqlite3
 import phonenumbers
+from contextlib import contextmanager
 from datetime import datetime
-from typing import Optional, List, Dict, Any
+from typing import Optional, Iterator, List, Dict, Any
 import logging
 
 
+# Matches everything except digits and '+', compiled once for normalization
+_PHONE_STRIP_RE = re.compile(r'[^\d+]')
+
+# Column order of bulk registration listings, which build dicts from plain
+# row tuples instead of going through sqlite3.Row
+REGISTRATION_COLUMNS = (
+    'id', 'full_name', 'call_sign', 'phone_number', 'phone_normalized', 'opted_in',
+    'registration_date', 'last_updated', 'ip_address', 'user_agent'
+)
+_SELECT_REGISTRATIONS = f"SELECT {', '.join(REGISTRATION_COLUMNS)} FROM registrations"
+# Built once so every call passes the same SQL text and reuses the prepared
+# statement from the connection's statement cache
+_LIST_REGISTRATIONS = _SELECT_REGISTRATIONS + " ORDER BY registration_date DESC LIMIT ? OFFSET ?"
+_LIST_OPTED_IN = _SELECT_REGISTRATIONS + " WHERE opted_in = 1 ORDER BY registration_date DESC"
+
+
+# Every SMS looks up its sender's number at least once, so repeat senders
+# are served from memoized results instead of re-parsing
+@functools.lru_cache(maxsize=4096)
+def _normalize(phone_number: str) -> str:
+    """Normalize a phone number to E.164; see RegistrationDatabase.normalize_phone_number."""
+    try:
+        # Clean the phone number - remove all non-digit characters except +.
+        # Twilio sends senders already in E.164, which needs no cleaning.
+        digits = phone_number[1:]
+        if phone_number.startswith('+') and digits.isascii() and digits.isdigit():
+            cleaned = phone_number
+        else:
+            cleaned = _PHONE_STRIP_RE.sub('', phone_number)
+        
+        # If it doesn't start with +, assume it's a US number
+        if not cleaned.startswith('+'):
+            # If it starts with 1 and has 11 digits, it's already US format
+            if cleaned.startswith('1') and len(cleaned) == 11:
+                cleaned = '+' + cleaned
+            # If it has 10 digits, add +1
+            elif len(cleaned) == 10:
+                cleaned = '+1' + cleaned
+            else:
+                # Try to parse as US number
+                cleaned = '+1' + cleaned
+        
+        # Parse the phone number
+        parsed = phonenumbers.parse(cleaned, None)
+        
+        # Cheap length check first, so garbage never reaches the full
+        # metadata pattern match in is_valid_number
+        if not phonenumbers.is_possible_number(parsed):
+            raise ValueError("Invalid phone number")
+        
+        # For testing purposes, allow 555 numbers even if they're not "valid"
+        # In production, you might want stricter validation
+        if not phonenumbers.is_valid_number(parsed):
+            # Check if it's a 555 number (test numbers)
+            if cleaned.startswith('+1555') and len(cleaned) == 12:
+                # Allow 555 test numbers
+                pass
+            else:
+                raise ValueError("Invalid phone number")
+        
+        # Return in E.164 format
+        return phonenumbers.format_number(parsed, phonenumbers.PhoneNumberFormat.E164)
+        
+    except phonenumbers.NumberParseException as e:
+        raise ValueError(f"Could not parse phone number: {str(e)}")
+
+
 class RegistrationDatabase:
     """Handles database operations for user registrations."""
     
-    def __init__(self, db_path: str = None):
-        """Initialize the database connection."""
+    def __init__(self, db_path: str = None, pool_size: int = 5):
+        """
+        Initialize the database connection pool.
+        
+        Args:
+            db_path: Path to the SQLite database file
+            pool_size: Maximum number of idle connections kept for reuse
+        """
         if db_path is None:
-            # Try shared location first, fallback to local
+            # An explicit REGISTRATION_DB_PATH wins; otherwise try the shared
+            # location first, fallback to local
             import os
+            env_path = os.environ.get("REGISTRATION_DB_PATH")
             shared_path = "/opt/hampuff-data/registrations.db"
             local_path = "registrations.db"
             
-            if os.path.exists(shared_path):
+            if env_path:
+                self.db_path = env_path
+            elif os.path.exists(shared_path):
                 self.db_path = shared_path
             else:
                 self.db_path = local_path
@@ -29,11 +110,56 @@ class RegistrationDatabase:
             self.db_path = db_path
             
         self.logger = logging.getLogger(__name__)
+        self._pool = queue.Queue(maxsize=pool_size)
         self._init_database()
     
+    def _connect(self) -> sqlite3.Connection:
+        """Open a new database connection."""
+        # Pooled connections may be handed to a different thread or greenlet.
+        # Each keeps its own prepared-statement cache, which easily holds every
+        # query in this module, so reused connections skip SQL parsing.
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, cached_statements=32)
+        conn.row_factory = sqlite3.Row
+        # Safe with WAL: a crash can only lose the last commits, not corrupt
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+    
+    @contextmanager
+    def _connection(self):
+        """
+        Borrow a connection from the pool for the duration of a transaction.
+        
+        The transaction is committed on success and rolled back on error; the
+        connection is then returned to the pool instead of being closed.
+        """
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            conn = self._connect()
+        
+        try:
+            with conn:
+                yield conn
+        finally:
+            try:
+                self._pool.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+    
+    def close(self):
+        """Close all idle pooled connections."""
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
+    
     def _init_database(self):
         """Create the database table if it doesn't exist."""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connection() as conn:
+            # WAL lets readers proceed while a registration is being written;
+            # the mode is stored in the database file, so it only needs setting once
+            conn.execute("PRAGMA journal_mode=WAL")
             conn.execute("""
                 CREATE TABLE IF NOT EXISTS registrations (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -48,6 +174,12 @@ class RegistrationDatabase:
                     user_agent TEXT
                 )
             """)
+            # UNIQUE already implies an index; name it so lookups don't
+            # depend on SQLite's autoindex
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_phone_normalized
+                ON registrations(phone_normalized)
+            """)
             conn.commit()
     
     def normalize_phone_number(self, phone_number: str) -> str:
@@ -63,40 +195,7 @@ class RegistrationDatabase:
         Raises:
             ValueError: If phone number is invalid
         """
-        try:
-            # Clean the phone number - remove all non-digit characters except +
-            cleaned = ''.join(c for c in phone_number if c.isdigit() or c == '+')
-            
-            # If it doesn't start with +, assume it's a US number
-            if not cleaned.startswith('+'):
-                # If it starts with 1 and has 11 digits, it's already US format
-                if cleaned.startswith('1') and len(cleaned) == 11:
-                    cleaned = '+' + cleaned
-                # If it has 10 digits, add +1
-                elif len(cleaned) == 10:
-                    cleaned = '+1' + cleaned
-                else:
-                    # Try to parse as US number
-                    cleaned = '+1' + cleaned
-            
-            # Parse the phone number
-            parsed = phonenumbers.parse(cleaned, None)
-            
-            # For testing purposes, allow 555 numbers even if they're not "valid"
-            # In production, you might want stricter validation
-            if not phonenumbers.is_valid_number(parsed):
-                # Check if it's a 555 number (test numbers)
-                if cleaned.startswith('+1555') and len(cleaned) == 12:
-                    # Allow 555 test numbers
-                    pass
-                else:
-                    raise ValueError("Invalid phone number")
-            
-            # Return in E.164 format
-            return phonenumbers.format_number(parsed, phonenumbers.PhoneNumberFormat.E164)
-            
-        except phonenumbers.NumberParseException as e:
-            raise ValueError(f"Could not parse phone number: {str(e)}")
+        return _normalize(phone_number)
     
     def register_user(self, full_name: str, call_sign: str, phone_number: str, 
                      opted_in: bool, ip_address: Optional[str] = None, 
@@ -122,11 +221,11 @@ class RegistrationDatabase:
         normalized_phone = self.normalize_phone_number(phone_number)
         
         # Check if phone number already exists
-        if self.get_user_by_phone(normalized_phone):
+        if self._lookup_normalized(normalized_phone):
             raise ValueError("Phone number already registered")
         
         # Insert new registration
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connection() as conn:
             cursor = conn.execute("""
                 INSERT INTO registrations 
                 (full_name, call_sign, phone_number, phone_normalized, opted_in, ip_address, user_agent)
@@ -136,7 +235,7 @@ class RegistrationDatabase:
             registration_id = cursor.lastrowid
             conn.commit()
         
-        self.logger.info(f"New registration: {full_name} ({call_sign}) - {normalized_phone}")
+        self.logger.info("New registration: %s (%s) - %s", full_name, call_sign, normalized_phone)
         
         return {
             "id": registration_id,
@@ -148,23 +247,39 @@ class RegistrationDatabase:
             "registration_date": datetime.now().isoformat()
         }
     
-    def get_user_by_phone(self, phone_number: str) -> Optional[Dict[str, Any]]:
+    def get_user_by_phone(self, phone_number: str,
+                          normalized: bool = False) -> Optional[Dict[str, Any]]:
         """
         Get user registration by phone number.
         
         Args:
             phone_number: Phone number (will be normalized)
+            normalized: True if phone_number came from normalize_phone_number
             
         Returns:
             User data dictionary or None if not found
         """
+        if normalized:
+            return self._lookup_normalized(phone_number)
+        
         try:
             normalized_phone = self.normalize_phone_number(phone_number)
         except ValueError:
             return None
         
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
+        return self._lookup_normalized(normalized_phone)
+    
+    def _lookup_normalized(self, normalized_phone: str) -> Optional[Dict[str, Any]]:
+        """
+        Get user registration by an already-normalized E.164 phone number.
+        
+        Args:
+            normalized_phone: Phone number as returned by normalize_phone_number
+            
+        Returns:
+            User data dictionary or None if not found
+        """
+        with self._connection() as conn:
             cursor = conn.execute("""
                 SELECT * FROM registrations WHERE phone_normalized = ?
             """, (normalized_phone,))
@@ -174,23 +289,28 @@ class RegistrationDatabase:
                 return dict(row)
             return None
     
-    def update_opt_in_status(self, phone_number: str, opted_in: bool) -> bool:
+    def update_opt_in_status(self, phone_number: str, opted_in: bool,
+                             normalized: bool = False) -> bool:
         """
         Update user's opt-in status.
         
         Args:
             phone_number: Phone number (will be normalized)
             opted_in: New opt-in status
+            normalized: True if phone_number came from normalize_phone_number
             
         Returns:
             True if updated, False if user not found
         """
-        try:
-            normalized_phone = self.normalize_phone_number(phone_number)
-        except ValueError:
-            return False
+        if normalized:
+            normalized_phone = phone_number
+        else:
+            try:
+                normalized_phone = self.normalize_phone_number(phone_number)
+            except ValueError:
+                return False
         
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connection() as conn:
             cursor = conn.execute("""
                 UPDATE registrations 
                 SET opted_in = ?, last_updated = CURRENT_TIMESTAMP
@@ -200,39 +320,79 @@ class RegistrationDatabase:
             conn.commit()
             return cursor.rowcount > 0
     
-    def get_all_registrations(self) -> List[Dict[str, Any]]:
-        """Get all registrations."""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.execute("""
-                SELECT * FROM registrations ORDER BY registration_date DESC
-            """)
+    def _iter_rows(self, sql: str, params: tuple = ()) -> Iterator[Dict[str, Any]]:
+        """Run a registration listing query and yield each row as a dict."""
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = None
+            for row in cursor.execute(sql, params):
+                yield dict(zip(REGISTRATION_COLUMNS, row))
+    
+    def iter_registrations(self, limit: Optional[int] = None,
+                           offset: int = 0) -> Iterator[Dict[str, Any]]:
+        """
+        Stream registrations, newest first, without building a list.
+        
+        The pooled connection is held until the iterator is exhausted or closed.
+        
+        Args:
+            limit: Maximum number of rows to return (all rows if None)
+            offset: Number of rows to skip, for paging through large tables
             
-            return [dict(row) for row in cursor.fetchall()]
+        Yields:
+            Registration dictionaries
+        """
+        return self._iter_rows(_LIST_REGISTRATIONS, (-1 if limit is None else limit, offset))
+    
+    def get_all_registrations(self, limit: Optional[int] = None,
+                              offset: int = 0) -> List[Dict[str, Any]]:
+        """
+        Get registrations, newest first.
+        
+        Args:
+            limit: Maximum number of rows to return (all rows if None)
+            offset: Number of rows to skip, for paging through large tables
+            
+        Returns:
+            List of registration dictionaries
+        """
+        return list(self.iter_registrations(limit, offset))
+    
+    def count_registrations(self, opted_in: Optional[bool] = None) -> int:
+        """
+        Count registrations without loading them.
+        
+        Args:
+            opted_in: Only count users with this opt-in status (all users if None)
+            
+        Returns:
+            Number of matching registrations
+        """
+        with self._connection() as conn:
+            if opted_in is None:
+                cursor = conn.execute("SELECT COUNT(*) FROM registrations")
+            else:
+                cursor = conn.execute(
+                    "SELECT COUNT(*) FROM registrations WHERE opted_in = ?", (opted_in,)
+                )
+            return cursor.fetchone()[0]
     
     def get_opted_in_users(self) -> List[Dict[str, Any]]:
         """Get all users who have opted in to SMS."""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.execute("""
-                SELECT * FROM registrations 
-                WHERE opted_in = 1 
-                ORDER BY registration_date DESC
-            """)
-            
-            return [dict(row) for row in cursor.fetchall()]
+        return list(self._iter_rows(_LIST_OPTED_IN))
     
-    def is_user_opted_in(self, phone_number: str) -> bool:
+    def is_user_opted_in(self, phone_number: str, normalized: bool = False) -> bool:
         """
         Check if a user is opted in to SMS.
         
         Args:
             phone_number: Phone number (will be normalized)
+            normalized: True if phone_number came from normalize_phone_number
             
         Returns:
             True if user is opted in, False otherwise
         """
-        user = self.get_user_by_phone(phone_number)
+        user = self.get_user_by_phone(phone_number, normalized=normalized)
         return user and user.get('opted_in', False)
     
     def is_user_registered(self, phone_number: str) -> bool:
@@ -6,107 +6,218 @@ Handles SMS request processing and response generation for the Hampuff service.
 """
 
 import logging
-import sys
-import os
-from flask import request, current_app
-from twilio.twiml.messaging_response import MessagingResponse
+import re
+import threading
+from flask import request
+from xml.sax import saxutils
 
-# Add the project root to the Python path for imports
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
-from hampuff_lib.hampuff_lib import HampuffDataProvider
+from hampuff_lib.hampuff_lib import HampuffDataProvider, get_provider
+from config import Config
 from models import RegistrationDatabase
+from extensions import cache
+
+
+# TwiML reply with a single message, as twilio's MessagingResponse would
+# serialize it; the text must be XML-escaped before substitution
+TWIML_MESSAGE_TEMPLATE = (
+    '<?xml version="1.0" encoding="UTF-8"?><Response><Message>%s</Message></Response>'
+)
+
+# Fixed SMS replies
+NO_BODY_MESSAGE = "No message body received"
+OPT_OUT_MESSAGE = (
+    "You have been unregistered from SMS service. "
+    "You will no longer receive messages. Reply START to re-register."
+)
+OPT_OUT_NOT_REGISTERED_MESSAGE = "You are not currently registered. No action needed."
+OPT_IN_MESSAGE = (
+    "You have been registered for SMS service. "
+    "Send a ham radio propagation query to get started!"
+)
+REGISTER_FIRST_MESSAGE = (
+    "You need to complete registration first. "
+    "Please visit www.hampuff.com/register to register with your name and call sign."
+)
+NOT_REGISTERED_MESSAGE = (
+    "You are not registered for SMS service. Please visit www.hampuff.com/register to opt-in."
+)
+SERVICE_UNAVAILABLE_MESSAGE = "Service temporarily unavailable. Please try again later."
+PROCESSING_ERROR_MESSAGE = "Sorry, an error occurred processing your request."
+TIMEZONE_UNAVAILABLE_MESSAGE = (
+    "Sorry, unable to retrieve hampuff data for timezone %s. Supported timezones: "
+    "EST, EDT, CST, CDT, MST, MDT, PST, PDT, AKST, AKDT, HST, AST, ChST, GST, UTC, GMT."
+)
+HAMPUFF_UNAVAILABLE_MESSAGE = "Sorry, unable to retrieve hampuff data at this time."
+
+# Profanity keywords and their replies, matched anywhere in the message with a
+# single scan. Keywords must be at least 4 characters long (see the airport
+# code check in _generate_response).
+PROFANITY_RESPONSES = {
+    'fuck': "Go fuck yourself, too",
+    'shit': "Go shit your pants",
+}
+# One alternation over the whole table scans the body once however many
+# keywords there are; longer keywords go first so that where one keyword
+# starts with another, the more specific reply wins
+_PROFANITY_RE = re.compile(
+    '|'.join(map(re.escape, sorted(PROFANITY_RESPONSES, key=len, reverse=True)))
+)
+
+# Seconds a structured propagation payload is reused; hamqsl updates far less
+# often, and the raw feed itself is cached by hampuff_lib
+PROPAGATION_JSON_CACHE_TIMEOUT = 60
+
+# Upper-cased timezone codes accepted by "prop <TZ>" ('ChST' -> 'CHST')
+VALID_TIMEZONES = frozenset(HampuffDataProvider.TIMEZONE_MAP_UPPER)
+
+# "prop <TZ>" / "propagation <TZ>" on the lowercased body; the timezone must
+# be a whole word, and anything after it is ignored
+_PROPAGATION_RE = re.compile(
+    r'\s*(?:prop|propagation)\s+(%s)(?:\s|$)'
+    % '|'.join(sorted(tz.lower() for tz in VALID_TIMEZONES))
+)
+
+# Reply to HELP / ?, listing the commands and supported timezones
+HELP_MESSAGE = (
+    "HamPuff SMS Commands:\n\n"
+    "PROPAGATION:\n"
+    "• prop [TIMEZONE] - Get solar propagation data\n"
+    "• propagation [TIMEZONE] - Same as above\n"
+    "• hampuffe - Legacy (Eastern time)\n"
+    "• hampuffp - Legacy (Pacific time)\n\n"
+    "REGISTRATION:\n"
+    "• START or REGISTER - Opt-in to SMS service\n"
+    "• STOP or UNREGISTER - Opt-out from SMS service\n\n"
+    "SUPPORTED TIMEZONES:\n"
+    "US Continental: EST, EDT, CST, CDT, MST, MDT, PST, PDT\n"
+    "Alaska: AKST, AKDT\n"
+    "Hawaii: HST\n"
+    "Puerto Rico: AST\n"
+    "Guam: ChST, GST\n"
+    "Universal: UTC, GMT\n\n"
+    "EXAMPLES:\n"
+    "• prop EST\n"
+    "• propagation PDT\n"
+    "• prop HST\n\n"
+    "HELP:\n"
+    "• HELP or ? - Show this message"
+)
+
+
+# Config-derived replies, resolved once by bind_config() when the app is
+# created; the defaults keep the handler usable without an app
+_AIRPUFF = Config.AIRPUFF_MESSAGE
+_DEFAULT = Config.DEFAULT_WRONG_NUMBER_MESSAGE
+_CONSENT = "\n\n" + Config.CONSENT_MESSAGE
+_OPT_IN_TIMEOUT = Config.OPT_IN_CACHE_TIMEOUT
+
+
+def bind_config(config):
+    """
+    Resolve the reply settings the SMS handler reads on every request.
+    
+    Args:
+        config: Flask app config (or any mapping with the Config keys)
+    """
+    global _AIRPUFF, _DEFAULT, _CONSENT, _OPT_IN_TIMEOUT
+    _AIRPUFF = config["AIRPUFF_MESSAGE"]
+    _DEFAULT = config["DEFAULT_WRONG_NUMBER_MESSAGE"]
+    _CONSENT = "\n\n" + config["CONSENT_MESSAGE"]
+    _OPT_IN_TIMEOUT = config["OPT_IN_CACHE_TIMEOUT"]
+
+
+@cache.memoize(timeout=PROPAGATION_JSON_CACHE_TIMEOUT)
+def _propagation_payload(timezone_code):
+    """
+    Build the structured propagation payload for an upper-cased timezone code.
+    
+    Memoized on the code alone, so every handler shares the same entries.
+    """
+    provider = get_provider()
+    
+    # Get the timezone object
+    timezone = provider._get_timezone_from_code(timezone_code)
+    
+    # Fetch solar data
+    solar_data = provider._fetch_solar_data()
+    
+    # Parse update time
+    update_time = provider._parse_update_time(solar_data['updated'], timezone)
+    
+    # Return structured JSON
+    return {
+        "timezone": timezone_code,
+        "timezone_name": provider.TZ_DISPLAY[timezone],
+        "updated": update_time,
+        "data": {
+            "solar_flux": solar_data.get('solarflux', 'N/A'),
+            "a_index": solar_data.get('aindex', 'N/A'),
+            "k_index": solar_data.get('kindex', 'N/A'),
+            "sunspots": solar_data.get('sunspots', 'N/A'),
+            "muf": solar_data.get('muf', 'N/A'),
+            "xray": solar_data.get('xray', 'N/A'),
+            "solar_winds": solar_data.get('solarwind', 'N/A')
+        },
+        "raw_updated_utc": solar_data.get('updated', 'N/A')
+    }
 
 
 class SMSHandler:
     """Handles SMS requests and generates appropriate responses."""
     
+    __slots__ = ('logger', 'hampuff_provider', 'db', '_commands')
+    
     def __init__(self):
         """Initialize the SMS handler."""
         self.logger = logging.getLogger(__name__)
-        self.hampuff_provider = HampuffDataProvider()
+        self.hampuff_provider = get_provider()
         self.db = RegistrationDatabase()
+        
+        # Exact-match commands (lowercased body) answered before the opt-in
+        # check; a handler returning None falls through to normal processing
+        self._commands = {
+            'stop': self._handle_stop,
+            'unregister': self._handle_stop,
+            'start': self._handle_start,
+            'register': self._handle_start,
+            'help': self._handle_help,
+            '?': self._handle_help,
+        }
     
     def handle_sms_request(self):
         """Process incoming SMS request and return TwiML response."""
         try:
             # Get SMS body and sender phone number from request
-            full_body = request.values.get('Body', '')
+            body = request.values.get('Body', '').strip()
             sender_phone = request.values.get('From', '')
             
-            if not full_body:
-                return self._create_response("No message body received")
+            # Missing and whitespace-only bodies are treated alike
+            if not body:
+                return self._create_response(NO_BODY_MESSAGE)
             
             # Clean and process the message
-            body = full_body.strip()
             body_lower = body.lower()
-            self.logger.info(f"Received SMS from {sender_phone}: {body}")
+            self.logger.info("Received SMS from %s: %s", sender_phone, body)
             
-            # Handle STOP/UNREGISTER commands before checking opt-in status
-            # These commands should work even if user is not opted-in
-            if body_lower in ['stop', 'unregister']:
-                try:
-                    success = self.db.update_opt_in_status(sender_phone, False)
-                    if success:
-                        self.logger.info(f"User {sender_phone} opted out via {body_lower}")
-                        return self._create_response(
-                            "You have been unregistered from SMS service. "
-                            "You will no longer receive messages. Reply START to re-register."
-                        )
-                    else:
-                        # User not found, but we'll still confirm opt-out
-                        self.logger.info(f"Opt-out requested for unregistered number {sender_phone}")
-                        return self._create_response(
-                            "You are not currently registered. No action needed."
-                        )
-                except Exception as e:
-                    self.logger.error(f"Database error during opt-out: {str(e)}")
-                    return self._create_response(
-                        "Service temporarily unavailable. Please try again later."
-                    )
+            # Normalize the sender once; None means it can't be registered
+            sender = self._normalize(sender_phone)
             
-            # Handle START/REGISTER commands before checking opt-in status
-            if body_lower in ['start', 'register']:
-                try:
-                    # Check if user is already registered
-                    user = self.db.get_user_by_phone(sender_phone)
-                    if user:
-                        # User exists, just opt them in
-                        success = self.db.update_opt_in_status(sender_phone, True)
-                        if success:
-                            self.logger.info(f"User {sender_phone} opted in via {body_lower}")
-                            return self._create_response(
-                                "You have been registered for SMS service. "
-                                "Send a ham radio propagation query to get started!"
-                            )
-                    else:
-                        # User not registered, need to register via web
-                        return self._create_response(
-                            "You need to complete registration first. "
-                            "Please visit www.hampuff.com/register to register with your name and call sign."
-                        )
-                except Exception as e:
-                    self.logger.error(f"Database error during opt-in: {str(e)}")
-                    return self._create_response(
-                        "Service temporarily unavailable. Please try again later."
-                    )
-            
-            # Handle HELP command - available to everyone
-            if body_lower in ['help', '?']:
-                return self._create_response(self._get_help_message())
+            # Handle STOP/START/HELP commands before checking opt-in status;
+            # these work even if the user is not opted-in
+            command = self._commands.get(body_lower)
+            if command is not None:
+                response = command(sender_phone, sender, body_lower)
+                if response is not None:
+                    return response
             
             # Check if sender is registered and opted-in for other commands
             try:
-                if not self.db.is_user_opted_in(sender_phone):
-                    return self._create_response(
-                        "You are not registered for SMS service. Please visit www.hampuff.com/register to opt-in."
-                    )
+                if not self._is_sender_opted_in(sender):
+                    return self._create_response(NOT_REGISTERED_MESSAGE)
             except Exception as e:
-                self.logger.error(f"Database error checking registration: {str(e)}")
+                self.logger.error("Database error checking registration: %s", e)
                 # Fail closed - don't send SMS if we can't verify registration
-                return self._create_response(
-                    "Service temporarily unavailable. Please try again later."
-                )
+                return self._create_response(SERVICE_UNAVAILABLE_MESSAGE)
             
             # Generate appropriate response
             response_text = self._generate_response(body, body_lower)
@@ -115,46 +226,139 @@ class SMSHandler:
             return self._create_response(response_text)
             
         except Exception as e:
-            self.logger.error(f"Error processing SMS request: {str(e)}")
-            return self._create_response("Sorry, an error occurred processing your request.")
+            self.logger.error("Error processing SMS request: %s", e)
+            return self._create_response(PROCESSING_ERROR_MESSAGE)
+    
+    def _handle_stop(self, sender_phone, sender, command):
+        """Handle STOP/UNREGISTER: opt the sender out."""
+        try:
+            success = sender is not None and self.db.update_opt_in_status(
+                sender, False, normalized=True
+            )
+            self._forget_sender(sender)
+            if success:
+                self.logger.info("User %s opted out via %s", sender_phone, command)
+                return self._create_response(OPT_OUT_MESSAGE)
+            else:
+                # User not found, but we'll still confirm opt-out
+                self.logger.info("Opt-out requested for unregistered number %s", sender_phone)
+                return self._create_response(OPT_OUT_NOT_REGISTERED_MESSAGE)
+        except Exception as e:
+            self.logger.error("Database error during opt-out: %s", e)
+            return self._create_response(SERVICE_UNAVAILABLE_MESSAGE)
+    
+    def _handle_start(self, sender_phone, sender, command):
+        """Handle START/REGISTER: opt a registered sender back in."""
+        try:
+            # Check if user is already registered
+            user = sender and self.db.get_user_by_phone(sender, normalized=True)
+            if user:
+                # User exists, just opt them in
+                success = self.db.update_opt_in_status(sender, True, normalized=True)
+                self._forget_sender(sender)
+                if success:
+                    self.logger.info("User %s opted in via %s", sender_phone, command)
+                    return self._create_response(OPT_IN_MESSAGE)
+            else:
+                # User not registered, need to register via web
+                return self._create_response(REGISTER_FIRST_MESSAGE)
+        except Exception as e:
+            self.logger.error("Database error during opt-in: %s", e)
+            return self._create_response(SERVICE_UNAVAILABLE_MESSAGE)
+        return None
+    
+    def _handle_help(self, sender_phone, sender, command):
+        """Handle HELP/?: available to everyone."""
+        return self._create_response(self._get_help_message())
+    
+    def _normalize(self, phone_number):
+        """Normalize a phone number to E.164, or None if it is invalid."""
+        try:
+            return self.db.normalize_phone_number(phone_number)
+        except ValueError:
+            return None
+    
+    def _is_sender_opted_in(self, sender):
+        """
+        Opt-in check for a normalized sender (None is never opted in).
+        
+        Only "not opted in" answers are cached. The cache may be local to a
+        worker and misses opt-outs made elsewhere (other workers, the
+        website), so a sender is never treated as opted in without reading
+        the database. A stale negative answer only delays a new registration.
+        """
+        if sender is None:
+            return False
+        
+        key = f"opt_in:{sender}"
+        if cache.get(key) is False:
+            return False
+        opted_in = bool(self.db.is_user_opted_in(sender, normalized=True))
+        if not opted_in:
+            cache.set(key, False, timeout=_OPT_IN_TIMEOUT)
+        return opted_in
+    
+    def _forget_sender(self, sender):
+        """Drop the cached "not opted in" answer for a normalized sender."""
+        if sender is not None:
+            cache.delete(f"opt_in:{sender}")
+    
+    def is_opted_in(self, phone_number):
+        """
+        Check whether a sender is opted in, reusing recent negative answers.
+        
+        Args:
+            phone_number: Sender phone number in any format
+            
+        Returns:
+            True if the sender is registered and opted in
+        """
+        return self._is_sender_opted_in(self._normalize(phone_number))
+    
+    def forget_opt_in(self, phone_number):
+        """Drop a cached "not opted in" answer after the registration changes."""
+        self._forget_sender(self._normalize(phone_number))
     
     def _generate_response(self, body, body_lower):
         """Generate response text based on message content."""
         
-        # Check for profanity
-        if 'fuck' in body_lower:
-            return "Go fuck yourself, too"
-        
-        if 'shit' in body_lower:
-            return "Go shit your pants"
+        # Check for 4-character messages (airport codes) first; no keyword is
+        # shorter than 4 characters, so only an exact keyword can match here
+        if len(body_lower) == 4 and body_lower not in PROFANITY_RESPONSES:
+            return _AIRPUFF
         
-        # Check for 4-character messages (airport codes)
-        if len(body_lower) == 4:
-            return current_app.config["AIRPUFF_MESSAGE"]
+        # Check for profanity
+        profanity = _PROFANITY_RE.search(body_lower)
+        if profanity:
+            return PROFANITY_RESPONSES[profanity.group()]
         
         # Check for propagation requests (prop/propagation with timezone)
         # Examples: "prop EST", "propagation PDT", "prop CST"
-        propagation_match = self._parse_propagation_command(body_lower)
+        # The body is already stripped, so anything else can skip the parse
+        propagation_match = (
+            self._parse_propagation_command(body_lower)
+            if body_lower.startswith('prop') else None
+        )
         if propagation_match:
             timezone_code = propagation_match
             try:
                 hampuff_data = self.hampuff_provider.get_hampuff_data_for_timezone(timezone_code)
-                return f"{hampuff_data}\n\n{current_app.config['CONSENT_MESSAGE']}"
+                return hampuff_data + _CONSENT
             except Exception as e:
-                self.logger.error(f"Error getting hampuff data: {str(e)}")
-                return f"Sorry, unable to retrieve hampuff data for timezone {timezone_code}. Supported timezones: EST, EDT, CST, CDT, MST, MDT, PST, PDT, AKST, AKDT, HST, AST, ChST, GST, UTC, GMT."
+                self.logger.error("Error getting hampuff data: %s", e)
+                return TIMEZONE_UNAVAILABLE_MESSAGE % timezone_code
         
         # Check for legacy hampuff requests (hampuffe, hampuffp)
         if 'hampuff' in body_lower:
             try:
                 hampuff_data = self.hampuff_provider.get_hampuff_data(body)
-                return f"{hampuff_data}\n\n{current_app.config['CONSENT_MESSAGE']}"
+                return hampuff_data + _CONSENT
             except Exception as e:
-                self.logger.error(f"Error getting hampuff data: {str(e)}")
-                return "Sorry, unable to retrieve hampuff data at this time."
+                self.logger.error("Error getting hampuff data: %s", e)
+                return HAMPUFF_UNAVAILABLE_MESSAGE
         
         # Default response for unrecognized messages
-        return current_app.config["DEFAULT_WRONG_NUMBER_MESSAGE"]
+        return _DEFAULT
     
     def _parse_propagation_command(self, body_lower):
         """
@@ -168,60 +372,15 @@ class SMSHandler:
         Returns:
             Timezone code (e.g., "EST", "PDT") if valid, None otherwise
         """
-        # Remove extra whitespace and split
-        parts = body_lower.split()
-        
-        if len(parts) < 2:
-            return None
-        
-        # Check if first part is "prop" or "propagation"
-        if parts[0] not in ['prop', 'propagation']:
-            return None
-        
-        # Get timezone code
-        tz_code = parts[1].upper()
-        
-        # Validate timezone code
-        valid_timezones = [
-            'EST', 'EDT', 'CST', 'CDT', 'MST', 'MDT', 'PST', 'PDT',  # US Continental
-            'AKST', 'AKDT',  # Alaska
-            'HST',  # Hawaii
-            'AST',  # Puerto Rico
-            'ChST', 'GST',  # Guam (Chamorro/Guam Standard Time)
-            'UTC', 'GMT'  # UTC/GMT (Universal Time)
-        ]
-        if tz_code in valid_timezones:
-            return tz_code
+        match = _PROPAGATION_RE.match(body_lower)
+        if match:
+            return match.group(1).upper()
         
         return None
     
     def _get_help_message(self):
-        """Generate help message with available commands and timezones."""
-        help_text = (
-            "HamPuff SMS Commands:\n\n"
-            "PROPAGATION:\n"
-            "• prop [TIMEZONE] - Get solar propagation data\n"
-            "• propagation [TIMEZONE] - Same as above\n"
-            "• hampuffe - Legacy (Eastern time)\n"
-            "• hampuffp - Legacy (Pacific time)\n\n"
-            "REGISTRATION:\n"
-            "• START or REGISTER - Opt-in to SMS service\n"
-            "• STOP or UNREGISTER - Opt-out from SMS service\n\n"
-            "SUPPORTED TIMEZONES:\n"
-            "US Continental: EST, EDT, CST, CDT, MST, MDT, PST, PDT\n"
-            "Alaska: AKST, AKDT\n"
-            "Hawaii: HST\n"
-            "Puerto Rico: AST\n"
-            "Guam: ChST, GST\n"
-            "Universal: UTC, GMT\n\n"
-            "EXAMPLES:\n"
-            "• prop EST\n"
-            "• propagation PDT\n"
-            "• prop HST\n\n"
-            "HELP:\n"
-            "• HELP or ? - Show this message"
-        )
-        return help_text
+        """Return the help message with available commands and timezones."""
+        return HELP_MESSAGE
     
     def get_propagation_data(self, timezone_code: str, include_consent: bool = False) -> str:
         """
@@ -240,16 +399,19 @@ class SMSHandler:
         try:
             hampuff_data = self.hampuff_provider.get_hampuff_data_for_timezone(timezone_code)
             if include_consent:
-                return f"{hampuff_data}\n\n{current_app.config['CONSENT_MESSAGE']}"
+                return hampuff_data + _CONSENT
             return hampuff_data
         except Exception as e:
-            self.logger.error(f"Error getting hampuff data: {str(e)}")
+            self.logger.error("Error getting hampuff data: %s", e)
             raise
     
     def get_propagation_data_json(self, timezone_code: str) -> dict:
         """
         Get propagation data for a timezone as structured JSON.
         
+        Results are memoized per timezone code for
+        PROPAGATION_JSON_CACHE_TIMEOUT seconds; failures are not cached.
+        
         Args:
             timezone_code: Timezone code (e.g., 'EST', 'PDT', 'CST')
             
@@ -260,40 +422,33 @@ class SMSHandler:
             ValueError: If timezone code is invalid
         """
         try:
-            # Get the timezone object
-            timezone = self.hampuff_provider._get_timezone_from_code(timezone_code)
-            
-            # Fetch solar data
-            solar_data = self.hampuff_provider._fetch_solar_data()
-            
-            # Parse update time
-            update_time = self.hampuff_provider._parse_update_time(
-                solar_data['updated'], 
-                timezone
-            )
-            
-            # Return structured JSON
-            return {
-                "timezone": timezone_code.upper(),
-                "timezone_name": str(timezone).split('/')[-1] if '/' in str(timezone) else str(timezone),
-                "updated": update_time,
-                "data": {
-                    "solar_flux": solar_data.get('solarflux', 'N/A'),
-                    "a_index": solar_data.get('aindex', 'N/A'),
-                    "k_index": solar_data.get('kindex', 'N/A'),
-                    "sunspots": solar_data.get('sunspots', 'N/A'),
-                    "muf": solar_data.get('muf', 'N/A'),
-                    "xray": solar_data.get('xray', 'N/A'),
-                    "solar_winds": solar_data.get('solarwind', 'N/A')
-                },
-                "raw_updated_utc": solar_data.get('updated', 'N/A')
-            }
+            return _propagation_payload(timezone_code.upper())
         except Exception as e:
-            self.logger.error(f"Error getting hampuff data JSON: {str(e)}")
+            self.logger.error("Error getting hampuff data JSON: %s", e)
             raise
     
     def _create_response(self, message_text):
         """Create a TwiML response with the given message."""
-        resp = MessagingResponse()
-        resp.message(message_text)
-        return str(resp)
+        return TWIML_MESSAGE_TEMPLATE % saxutils.escape(message_text)
+
+
+_handler = None
+_handler_lock = threading.Lock()
+
+
+def get_handler() -> SMSHandler:
+    """
+    Get the shared SMSHandler instance.
+    
+    The handler owns a registration database connection pool, so one
+    instance per process is reused by every app and request.
+    
+    Returns:
+        Process-wide SMSHandler
+    """
+    global _handler
+    if _handler is None:
+        with _handler_lock:
+            if _handler is None:
+                _handler = SMSHandler()
+    return _handler
@@ -6,15 +6,36 @@ This script runs all tests and validates the registration system.
 
 import sys
 import os
+import tempfile
 import unittest
 from unittest.mock import patch, MagicMock
 
 # Add the project root to the Python path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
+# Keep the app's registration database (and its WAL files) out of the
+# working tree; removed automatically when the test run exits
+_TEST_DB_DIR = tempfile.TemporaryDirectory()
+os.environ["REGISTRATION_DB_PATH"] = os.path.join(_TEST_DB_DIR.name, "registrations.db")
+
+import models
 from models import RegistrationDatabase
-from services.sms_service import SMSHandler
+from services.sms_service import SMSHandler, bind_config, get_handler
+from hampuff_lib.hampuff_lib import HampuffDataProvider, clear_solar_cache, get_provider
 from app import create_app
+from extensions import cache
+
+# Parsed hamqsl.com solardata used in place of a live fetch
+SAMPLE_SOLAR_DATA = {
+    'updated': '15 Oct 2026 1200 GMT',
+    'solarflux': '150',
+    'aindex': '5',
+    'kindex': '2',
+    'sunspots': '100',
+    'muf': '20.5',
+    'xray': 'B1.2',
+    'solarwind': '400.1'
+}
 
 
 class TestRegistrationSystem(unittest.TestCase):
@@ -32,8 +53,11 @@ class TestRegistrationSystem(unittest.TestCase):
     def tearDown(self):
         """Clean up test fixtures."""
         import os
+        self.db.close()
         if hasattr(self, 'temp_db'):
-            os.unlink(self.temp_db.name)
+            for suffix in ('', '-wal', '-shm'):
+                if os.path.exists(self.temp_db.name + suffix):
+                    os.unlink(self.temp_db.name + suffix)
     
     def test_phone_normalization(self):
         """Test phone number normalization."""
@@ -49,6 +73,15 @@ class TestRegistrationSystem(unittest.TestCase):
                 result = self.db.normalize_phone_number(input_phone)
                 self.assertEqual(result, expected)
     
+    def test_phone_normalization_cached(self):
+        """Test repeat normalizations are served from the cache."""
+        self.db.normalize_phone_number("(555) 123-4567")
+        hits = models._normalize.cache_info().hits
+        self.assertEqual(self.db.normalize_phone_number("(555) 123-4567"), "+15551234567")
+        self.assertEqual(models._normalize.cache_info().hits, hits + 1)
+        with self.assertRaises(ValueError):
+            self.db.normalize_phone_number("12")
+    
     def test_user_registration(self):
         """Test user registration."""
         # Test successful registration
@@ -85,6 +118,14 @@ class TestRegistrationSystem(unittest.TestCase):
         
         self.assertIn("already registered", str(context.exception))
     
+    def test_register_normalizes_once(self):
+        """Test registration parses the phone number only once."""
+        with patch.object(self.db, 'normalize_phone_number',
+                          wraps=self.db.normalize_phone_number) as mock_normalize:
+            self.db.register_user("John Doe", "W1ABC", "(555) 123-4567", opted_in=True)
+        
+        mock_normalize.assert_called_once_with("(555) 123-4567")
+    
     def test_opt_in_status(self):
         """Test opt-in status checking."""
         # Register user
@@ -100,14 +141,151 @@ class TestRegistrationSystem(unittest.TestCase):
         self.assertTrue(self.db.is_user_opted_in("555-123-4567"))
         self.assertFalse(self.db.is_user_opted_in("(555) 999-9999"))
 
+    def test_registration_counts_and_paging(self):
+        """Test registration counts and paged listing."""
+        self.db.register_user("John Doe", "W1ABC", "(555) 123-4567", opted_in=True)
+        self.db.register_user("Jane Smith", "K2XYZ", "(555) 123-4568", opted_in=False)
+        
+        self.assertEqual(self.db.count_registrations(), 2)
+        self.assertEqual(self.db.count_registrations(opted_in=True), 1)
+        self.assertEqual(len(self.db.get_all_registrations()), 2)
+        self.assertEqual(len(self.db.get_all_registrations(limit=1)), 1)
+        self.assertEqual(len(self.db.get_all_registrations(limit=1, offset=1)), 1)
+        self.assertEqual(self.db.get_all_registrations(limit=1, offset=2), [])
+        
+        opted_in = self.db.get_opted_in_users()
+        self.assertEqual(opted_in, [self.db.get_user_by_phone("(555) 123-4567")])
+        self.assertEqual(len(list(self.db.iter_registrations())), 2)
+
+    def test_connection_reused(self):
+        """Test pooled connections are reused between operations."""
+        with self.db._connection() as first:
+            pass
+        with self.db._connection() as second:
+            pass
+        self.assertIs(first, second)
+    
+    def test_wal_journal_mode(self):
+        """Test the database is switched to write-ahead logging."""
+        with self.db._connection() as conn:
+            self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+
+
+class TestHampuffDataProvider(unittest.TestCase):
+    """Test the hampuff data provider."""
+    
+    def setUp(self):
+        """Set up test fixtures."""
+        clear_solar_cache()
+        self.addCleanup(clear_solar_cache)
+        self.provider = HampuffDataProvider()
+    
+    def test_solar_data_cached(self):
+        """Test solar data is downloaded once within the cache TTL."""
+        with patch.object(HampuffDataProvider, '_download_solar_data',
+                          return_value=SAMPLE_SOLAR_DATA) as mock_download:
+            first = self.provider._fetch_solar_data()
+            second = HampuffDataProvider()._fetch_solar_data()
+        
+        self.assertEqual(first, SAMPLE_SOLAR_DATA)
+        self.assertIs(first, second)
+        self.assertEqual(mock_download.call_count, 1)
+    
+    def test_solar_data_refetched_after_ttl(self):
+        """Test solar data is downloaded again once the cache expires."""
+        with patch.object(HampuffDataProvider, '_download_solar_data',
+                          return_value=SAMPLE_SOLAR_DATA) as mock_download:
+            self.provider._fetch_solar_data()
+            with patch('hampuff_lib.hampuff_lib.SOLAR_CACHE_TTL', 0):
+                self.provider._fetch_solar_data()
+        
+        self.assertEqual(mock_download.call_count, 2)
+    
+    def test_solar_data_stale_on_failure(self):
+        """Test a failed refresh serves the last good data and backs off."""
+        with patch.object(HampuffDataProvider, '_download_solar_data',
+                          return_value=SAMPLE_SOLAR_DATA):
+            self.provider._fetch_solar_data()
+        
+        with patch('hampuff_lib.hampuff_lib.SOLAR_CACHE_TTL', 0), \
+                patch.object(HampuffDataProvider, '_download_solar_data',
+                             side_effect=ValueError("down")) as mock_download:
+            self.assertEqual(self.provider._fetch_solar_data(), SAMPLE_SOLAR_DATA)
+            self.assertEqual(self.provider._fetch_solar_data(), SAMPLE_SOLAR_DATA)
+        self.assertEqual(mock_download.call_count, 1)
+    
+    def test_solar_data_failure_without_cache(self):
+        """Test a failed first download is not retried during the backoff."""
+        with patch.object(HampuffDataProvider, '_download_solar_data',
+                          side_effect=ValueError("down")) as mock_download:
+            with self.assertRaises(ValueError):
+                self.provider._fetch_solar_data()
+            with self.assertRaises(ValueError):
+                self.provider._fetch_solar_data()
+        self.assertEqual(mock_download.call_count, 1)
+    
+    def test_solar_data_parsed(self):
+        """Test the reported solardata fields are extracted from the feed."""
+        xml = (
+            '<?xml version="1.0" encoding="ISO-8859-1"?>'
+            '<solar><solardata><source url="http://www.hamqsl.com/solar.html">N0NBH</source>'
+            '<updated> 15 Oct 2026 1200 GMT</updated><solarflux>150</solarflux>'
+            '<aindex>5</aindex><kindex>2</kindex><sunspots>100</sunspots><muf>20.5</muf>'
+            '<xray>B1.2</xray><solarwind>400.1</solarwind>'
+            '<calculatedconditions><band name="80m-40m" time="day">Poor</band></calculatedconditions>'
+            '</solardata></solar>'
+        )
+        with patch('hampuff_lib.hampuff_lib._SESSION') as mock_session:
+            mock_session.get.return_value = MagicMock(content=xml.encode('iso-8859-1'))
+            self.assertEqual(self.provider._download_solar_data(), SAMPLE_SOLAR_DATA)
+    
+    def test_formatted_response_cached(self):
+        """Test a timezone's report is formatted once per solar update."""
+        timezone = self.provider.TIMEZONE_MAP['PST']
+        first = self.provider._format_hampuff_response(SAMPLE_SOLAR_DATA, timezone)
+        with patch.object(HampuffDataProvider, '_parse_update_time') as mock_parse:
+            second = self.provider._format_hampuff_response(dict(SAMPLE_SOLAR_DATA), timezone)
+        
+        self.assertIs(first, second)
+        mock_parse.assert_not_called()
+        self.assertTrue(first.startswith('[Hampuff - Pacific] Updated: Thu 15 Oct 05:00'))
+        
+        # The cache is shared by providers and emptied with the solar data
+        self.assertIs(HampuffDataProvider()._format_hampuff_response(SAMPLE_SOLAR_DATA, timezone), first)
+        clear_solar_cache()
+        with patch.object(HampuffDataProvider, '_parse_update_time',
+                          return_value='Thu 15 Oct 05:00') as mock_parse:
+            third = self.provider._format_hampuff_response(SAMPLE_SOLAR_DATA, timezone)
+        mock_parse.assert_called_once()
+        self.assertEqual(third, first)
+    
+    def test_timezone_code_lookup(self):
+        """Test timezone codes are matched case-insensitively."""
+        guam = self.provider.TIMEZONE_MAP['ChST']
+        self.assertIs(self.provider._get_timezone_from_code('ChST'), guam)
+        self.assertIs(self.provider._get_timezone_from_code('chst'), guam)
+        with self.assertRaises(ValueError) as context:
+            self.provider._get_timezone_from_code('XYZ')
+        self.assertIn('AKDT, AKST', str(context.exception))
+    
+    def test_shared_provider(self):
+        """Test the shared provider is created once and reused."""
+        self.assertIs(get_provider(), get_provider())
+
 
 class TestSMSHandler(unittest.TestCase):
     """Test the SMS handler functionality."""
     
+    @classmethod
+    def setUpClass(cls):
+        """Set up the app shared by all tests."""
+        cls.app = create_app()
+        cls.client = cls.app.test_client()
+    
     def setUp(self):
-        """Set up test fixtures."""
-        self.app = create_app()
-        self.client = self.app.test_client()
+        """Start each test with an empty cache."""
+        with self.app.app_context():
+            cache.clear()
     
     def test_sms_handler_with_registered_user(self):
         """Test SMS handler with registered user."""
@@ -146,16 +324,151 @@ class TestSMSHandler(unittest.TestCase):
                 # Test the handler
                 response = handler.handle_sms_request()
                 self.assertIn("not registered", response.lower())
+    
+    def test_shared_handler(self):
+        """Test apps share one process-wide SMS handler."""
+        self.assertIs(get_handler(), get_handler())
+    
+    def test_propagation_json_memoized(self):
+        """Test structured propagation data is built once per timezone for all handlers."""
+        handler = get_handler()
+        with self.app.app_context():
+            with patch.object(HampuffDataProvider, '_fetch_solar_data',
+                              return_value=SAMPLE_SOLAR_DATA) as mock_fetch:
+                first = handler.get_propagation_data_json('MST')
+                with patch('services.sms_service.RegistrationDatabase'):
+                    other = SMSHandler()
+                second = other.get_propagation_data_json('mst')
+        
+        self.assertEqual(first, second)
+        self.assertEqual(first['timezone'], 'MST')
+        self.assertEqual(first['timezone_name'], 'Mountain')
+        self.assertEqual(mock_fetch.call_count, 1)
+    
+    def test_stop_and_help_commands(self):
+        """Test STOP and HELP are answered without an opt-in check."""
+        with patch('services.sms_service.RegistrationDatabase') as mock_db_class:
+            mock_db = MagicMock()
+            mock_db.normalize_phone_number.return_value = '+15551234567'
+            mock_db.update_opt_in_status.return_value = True
+            mock_db_class.return_value = mock_db
+            handler = SMSHandler()
+        
+        with self.app.test_request_context('/sms', method='POST', data={
+            'Body': ' STOP ',
+            'From': '(555) 123-4567'
+        }):
+            response = handler.handle_sms_request()
+        self.assertIn("unregistered from SMS service", response)
+        mock_db.normalize_phone_number.assert_called_once_with('(555) 123-4567')
+        mock_db.update_opt_in_status.assert_called_once_with('+15551234567', False, normalized=True)
+        
+        with self.app.test_request_context('/sms', method='POST', data={
+            'Body': '?',
+            'From': '+15551234567'
+        }):
+            response = handler.handle_sms_request()
+        self.assertIn("HamPuff SMS Commands", response)
+        mock_db.is_user_opted_in.assert_not_called()
+    
+    def test_blank_body(self):
+        """Test whitespace-only bodies are answered without a database lookup."""
+        with patch('services.sms_service.RegistrationDatabase') as mock_db_class:
+            mock_db = MagicMock()
+            mock_db_class.return_value = mock_db
+            handler = SMSHandler()
+        
+        with self.app.test_request_context('/sms', method='POST', data={
+            'Body': ' \n\t ',
+            'From': '+15551234567'
+        }):
+            response = handler.handle_sms_request()
+        self.assertIn("No message body received", response)
+        mock_db.normalize_phone_number.assert_not_called()
+    
+    def test_bound_config_replies(self):
+        """Test config-derived replies come from the bound app config."""
+        handler = get_handler()
+        config = dict(self.app.config, AIRPUFF_MESSAGE="Try Airpuff",
+                      DEFAULT_WRONG_NUMBER_MESSAGE="Nope")
+        bind_config(config)
+        try:
+            self.assertEqual(handler._generate_response('KSFO', 'ksfo'), "Try Airpuff")
+            self.assertEqual(handler._generate_response('hello', 'hello'), "Nope")
+        finally:
+            bind_config(self.app.config)
+    
+    def test_twiml_matches_twilio(self):
+        """Test TwiML replies match twilio's MessagingResponse output."""
+        from twilio.twiml.messaging_response import MessagingResponse
+        
+        handler = get_handler()
+        for text in ("Go shit your pants", "a & b <c> \"q\"", "• prop EST\n\tMUF = 20.5"):
+            with self.subTest(text=text):
+                expected = MessagingResponse()
+                expected.message(text)
+                self.assertEqual(handler._create_response(text), str(expected))
+    
+    def test_opt_in_status_cached(self):
+        """Test only "not opted in" answers are cached."""
+        with self.app.app_context():
+            with patch('services.sms_service.RegistrationDatabase') as mock_db_class:
+                mock_db = MagicMock()
+                mock_db.normalize_phone_number.return_value = '+15551234567'
+                mock_db.is_user_opted_in.return_value = True
+                mock_db_class.return_value = mock_db
+                handler = SMSHandler()
+            
+            # Opted-in senders are re-read every time so opt-outs made
+            # elsewhere take effect immediately
+            self.assertTrue(handler.is_opted_in('+15551234567'))
+            self.assertTrue(handler.is_opted_in('(555) 123-4567'))
+            self.assertEqual(mock_db.is_user_opted_in.call_count, 2)
+            
+            mock_db.is_user_opted_in.return_value = False
+            self.assertFalse(handler.is_opted_in('+15551234567'))
+            self.assertFalse(handler.is_opted_in('+15551234567'))
+            self.assertEqual(mock_db.is_user_opted_in.call_count, 3)
+            
+            mock_db.is_user_opted_in.return_value = True
+            handler.forget_opt_in('+15551234567')
+            self.assertTrue(handler.is_opted_in('+15551234567'))
+            self.assertEqual(mock_db.is_user_opted_in.call_count, 4)
+    
+    def test_generate_response_keywords(self):
+        """Test keyword replies from the message classifier."""
+        with self.app.app_context():
+            with patch('services.sms_service.RegistrationDatabase'):
+                handler = SMSHandler()
+            
+            self.assertEqual(handler._generate_response('Fuck', 'fuck'), "Go fuck yourself, too")
+            self.assertEqual(handler._generate_response('bullshit', 'bullshit'), "Go shit your pants")
+            self.assertEqual(
+                handler._generate_response('KSFO', 'ksfo'),
+                self.app.config["AIRPUFF_MESSAGE"]
+            )
+            self.assertEqual(handler._parse_propagation_command('prop chst'), 'CHST')
+            self.assertIsNone(handler._parse_propagation_command('prop xyz'))
+            self.assertEqual(
+                handler._generate_response('hello there', 'hello there'),
+                self.app.config["DEFAULT_WRONG_NUMBER_MESSAGE"]
+            )
 
 
 class TestWebEndpoints(unittest.TestCase):
     """Test web endpoints."""
     
+    @classmethod
+    def setUpClass(cls):
+        """Set up the app shared by all tests."""
+        cls.app = create_app()
+        cls.app.config['TESTING'] = True
+        cls.client = cls.app.test_client()
+    
     def setUp(self):
-        """Set up test fixtures."""
-        self.app = create_app()
-        self.app.config['TESTING'] = True
-        self.client = self.app.test_client()
+        """Start each test with an empty cache."""
+        with self.app.app_context():
+            cache.clear()
     
     def test_health_endpoint(self):
         """Test health check endpoint."""
@@ -163,7 +476,78 @@ class TestWebEndpoints(unittest.TestCase):
         self.assertEqual(response.status_code, 200)
         data = response.get_json()
         self.assertEqual(data['status'], 'healthy')
+
+    def test_help_endpoints(self):
+        """Test JSON and plain text help endpoints."""
+        response = self.client.get('/sms/api/v1/help')
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+        self.assertIn('HamPuff SMS Commands', data['help'])
+        self.assertEqual(data['version'], 'v1')
+
+        response = self.client.get('/sms/curl/v1/help')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'text/plain')
+        self.assertEqual(response.get_data(as_text=True), data['help'])
     
+    def test_help_conditional_get(self):
+        """Test cacheable endpoints send an ETag and honor If-None-Match."""
+        response = self.client.get('/sms/api/v1/help')
+        self.assertIn('public', response.headers['Cache-Control'])
+        etag = response.headers['ETag']
+        
+        response = self.client.get('/sms/api/v1/help', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.get_data(), b'')
+        
+        response = self.client.get('/health')
+        self.assertEqual(response.headers['Cache-Control'], 'no-store')
+        self.assertEqual(response.headers['Pragma'], 'no-cache')
+        self.assertEqual(response.headers['Expires'], '0')
+        self.assertNotIn('ETag', response.headers)
+
+    def test_propagation_cached(self):
+        """Test repeated propagation requests are served from the cache."""
+        with patch('hampuff_lib.hampuff_lib.HampuffDataProvider._fetch_solar_data',
+                   return_value=SAMPLE_SOLAR_DATA) as mock_fetch:
+            first = self.client.get('/sms/api/v1/propagation/EST')
+            second = self.client.get('/sms/api/v1/prop/est')
+            self.assertEqual(first.status_code, 200)
+            self.assertEqual(first.data, second.data)
+            self.assertEqual(first.get_json()['data']['solar_flux'], '150')
+            self.assertEqual(mock_fetch.call_count, 1)
+
+    def test_propagation_invalid_timezone(self):
+        """Test JSON propagation endpoint with an unsupported timezone."""
+        response = self.client.get('/sms/api/v1/propagation/XYZ')
+        self.assertEqual(response.status_code, 400)
+        data = response.get_json()
+        self.assertEqual(data['timezone'], 'XYZ')
+        self.assertIn('ChST', data['supported_timezones'])
+
+    def test_api_register_malformed_json(self):
+        """Test API registration rejects a malformed JSON body."""
+        response = self.client.post(
+            '/sms/api/v1/register',
+            data='{"full_name": ',
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json()['error'], 'Invalid request')
+
+    def test_api_register_missing_fields(self):
+        """Test API registration reports missing fields in declared order."""
+        response = self.client.post('/sms/api/v1/register', json={
+            'call_sign': 'W1ABC'
+        })
+        self.assertEqual(response.status_code, 400)
+        data = response.get_json()
+        self.assertEqual(data['missing_fields'], ['full_name', 'phone_number', 'opted_in'])
+        self.assertEqual(
+            data['required_fields'],
+            ['full_name', 'call_sign', 'phone_number', 'opted_in']
+        )
+
     def test_register_get(self):
         """Test registration page GET request."""
         response = self.client.get('/register')
@@ -217,6 +601,7 @@ def run_tests():
     
     # Add test cases
     suite.addTests(loader.loadTestsFromTestCase(TestRegistrationSystem))
+    suite.addTests(loader.loadTestsFromTestCase(TestHampuffDataProvider))
     suite.addTests(loader.loadTestsFromTestCase(TestSMSHandler))
     suite.addTests(loader.loadTestsFromTestCase(TestWebEndpoints))
     
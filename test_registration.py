@@ -74,11 +74,8 @@ def test_admin_functions():
     db = RegistrationDatabase()
     
     print("Testing admin functions:")
-    registrations = db.get_all_registrations()
-    print(f"  Total registrations: {len(registrations)}")
-    
-    opted_in_users = db.get_opted_in_users()
-    print(f"  Opted-in users: {len(opted_in_users)}")
+    print(f"  Total registrations: {db.count_registrations()}")
+    print(f"  Opted-in users: {db.count_registrations(opted_in=True)}")
     
     print()
 
@@ -3,10 +3,23 @@
 WSGI entry point for production deployment.
 
 This file is used by WSGI servers like Gunicorn or uWSGI to serve the application.
+Production runs Gunicorn with gevent workers, so the standard library is
+patched before anything else is imported to let upstream HTTP calls yield to
+other requests. SQLite calls are not made cooperative by this: a locked
+database or slow fsync still stalls every request in that worker.
 """
 
+from gevent import monkey
+monkey.patch_all()
+
+import logging
 import os
 from app import create_app
+from config import get_config
+
+# Emit records at the configured level only; lower levels are discarded
+# before their messages are formatted
+logging.basicConfig(level=get_config().LOG_LEVEL)
 
 # Set environment for production
 os.environ.setdefault('FLASK_ENV', 'production')
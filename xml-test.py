@@ -2,68 +2,208 @@
 Gathers band conditions and solar data to reply to an SMS with the latest update
 """
 import datetime
-import pytz
+import os
+import threading
+import time
+import xml.sax
 import requests
-import xmltodict
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from zoneinfo import ZoneInfo
 
 USER_AGENT = 'HamPuff/14.074/220213'
 HP_URL = 'http://www.hamqsl.com/solarxml.php'
-HP_HDRS = {'User-Agent' : USER_AGENT}
-HP_REQ = requests.get(HP_URL, params=HP_HDRS)
-HP_RES = HP_REQ.text
-MY_DICT = xmltodict.parse(HP_RES)
-SOLARFLUX = MY_DICT['solar']['solardata']['solarflux']
-A_INDEX = MY_DICT['solar']['solardata']['aindex']
-K_INDEX = MY_DICT['solar']['solardata']['kindex']
-SUNSPOTS = MY_DICT['solar']['solardata']['sunspots']
-XRAY = MY_DICT['solar']['solardata']['xray']
-HELIUMLINE = MY_DICT['solar']['solardata']['heliumline']
-PROTONFLUX = MY_DICT['solar']['solardata']['protonflux']
-ELECTRONFLUX = MY_DICT['solar']['solardata']['electonflux']
-AURORA = MY_DICT['solar']['solardata']['aurora']
-NORMALIZATION = MY_DICT['solar']['solardata']['normalization']
-LATDEGREE = MY_DICT['solar']['solardata']['latdegree']
-SOLARWIND = MY_DICT['solar']['solardata']['solarwind']
-MAGNETICFIELD = MY_DICT['solar']['solardata']['magneticfield']
-GEOMAGFIELD = MY_DICT['solar']['solardata']['geomagfield']
-SIGNALNOISE = MY_DICT['solar']['solardata']['signalnoise']
-FOF2 = MY_DICT['solar']['solardata']['fof2']
-MUFFFACTOR = MY_DICT['solar']['solardata']['muffactor']
-MUF = MY_DICT['solar']['solardata']['muf']
-4080M_DAY = MY_DICT['solar']['solardata']['band name="80m-40m" time="day">Fair</band>
 
+# Shared session so replies reuse one keep-alive connection to hamqsl.com
+_SESSION = requests.Session()
+# requests decompresses gzip/deflate bodies transparently; asking for them
+# explicitly keeps the XML compressed on the wire
+_SESSION.headers.update({'User-Agent': USER_AGENT, 'Accept-Encoding': 'gzip, deflate'})
+# Retry brief hamqsl outages a couple of times, backing off between attempts
+_SESSION.mount('http://', HTTPAdapter(
+    pool_connections=1,
+    pool_maxsize=4,
+    max_retries=Retry(total=2, backoff_factor=0.3, status_forcelist=(500, 502, 503, 504))
+))
 
-def hampuff_data(hampuff_args):
-    # (1) Set the timezone
-    PAC               = pytz.timezone('US/Pacific')
-    EAS               = pytz.timezone('US/Eastern')
+# (connect, read) seconds, so a slow hamqsl.com can't hold a reply indefinitely
+HP_TIMEOUT = (3, 5)
+
+
+def _fetch_solar():
+    """Download the current solar XML from hamqsl.com as undecoded bytes."""
+    # The parser honours the XML declaration's encoding itself, so skip the
+    # charset detection .text would do
+    return _SESSION.get(HP_URL, timeout=HP_TIMEOUT).content
+
+
+# Reply timezones keyed by the last letter of the command (hampuffe / hampuffp)
+_TZ = {'e': ZoneInfo('America/New_York'), 'p': ZoneInfo('America/Los_Angeles')}
+
+# Bound once so the per-reply path does no datetime module attribute lookups
+_datetime = datetime.datetime
+_UTC = datetime.timezone.utc
+
+# English day and month abbreviations for the hamqsl timestamp and the reply
+_WEEKDAYS = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')
+_MONTH_NAMES = ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec')
+_MONTHS = {name: number for number, name in enumerate(_MONTH_NAMES, start=1)}
+
+# Reply layout, filled from the formatted update time, the cached solar data
+# and the daytime 80m-40m band conditions
+_REPLY_TEMPLATE = (
+    "[Hampuff]\tUpdated: {updated}"
+    "\n\tSolar Flux = {solar[solarflux]}"
+    "\n\tA Index    = {solar[aindex]}"
+    "\n\tK Index    = {solar[kindex]}"
+    "\n\tSunspot #  = {solar[sunspots]}"
+    "\n\tMUF        = {solar[muf]}"
+    "\n\tXRay       = {solar[xray]}"
+    "\n\tSolar Winds= {solar[solarwind]}"
+    "\n\t80m-40m Day= {band_80_40_day}"
+)
+
+# solardata fields kept from each download ('electonflux' is hamqsl's spelling)
+_SOLAR_KEYS = (
+    'solarflux', 'aindex', 'kindex', 'sunspots', 'xray', 'heliumline',
+    'protonflux', 'electonflux', 'aurora', 'normalization', 'latdegree',
+    'solarwind', 'magneticfield', 'geomagfield', 'signalnoise', 'fof2',
+    'muffactor', 'muf', 'updated',
+)
+_SOLAR_KEY_SET = frozenset(_SOLAR_KEYS)
+
+# Seconds parsed solar data is reused; hamqsl only updates it about hourly
+SOLAR_CACHE_TTL = 900
+# Seconds between background refreshes when HAMPUFF_SOLAR_REFRESH=true; kept
+# under the TTL so the cached copy never expires on a reply
+SOLAR_REFRESH_INTERVAL = 600
+_CACHE = {'exp': 0, 'data': None}
+
+
+class _SolarComplete(Exception):
+    """Raised by _SolarHandler to stop parsing once it has everything."""
+
+
+class _SolarHandler(xml.sax.ContentHandler):
+    """Collects the solardata fields and band conditions as the XML streams past."""
+
+    def __init__(self):
+        super().__init__()
+        self.fields = {}
+        # Band conditions keyed by (name, time), e.g. ('80m-40m', 'day')
+        self.bands = {}
+        self._current = None
+        self._band = None
+        self._buffer = []
+        self._seen_bands = False
+
+    def startElement(self, name, attrs):
+        if name in _SOLAR_KEY_SET:
+            self._current = name
+        elif name == 'band':
+            self._current = name
+            self._band = (attrs.get('name'), attrs.get('time'))
+        else:
+            self._current = None
+        self._buffer.clear()
+
+    def characters(self, content):
+        if self._current is not None:
+            self._buffer.append(content)
+
+    def endElement(self, name):
+        if name == self._current:
+            text = ''.join(self._buffer).strip()
+            if name == 'band':
+                self.bands[self._band] = text
+            else:
+                self.fields[name] = text
+            self._current = None
+        elif name == 'calculatedconditions':
+            self._seen_bands = True
+        if self._seen_bands and len(self.fields) == len(_SOLAR_KEY_SET):
+            raise _SolarComplete
 
-    hampuff_list = list(hampuff_args.lower())
-    if len(hampuff_list) != 8:
+
+def _parse_solar(xml_bytes):
+    """
+    Collect the solardata fields and band conditions in one streaming pass.
+
+    Only the text of wanted elements is kept, and parsing stops once every
+    field and the band conditions have been seen.
+    """
+    handler = _SolarHandler()
+    try:
+        xml.sax.parseString(xml_bytes, handler)
+    except _SolarComplete:
+        pass
+    data = handler.fields
+    data['bands'] = handler.bands
+    return data
+
+
+def _refresh_solar():
+    """Download and parse the feed, replacing the cached copy."""
+    data = _parse_solar(_fetch_solar())
+    # Publish the data before its expiry so a reader never pairs a fresh
+    # expiry with stale (or missing) data
+    _CACHE['data'] = data
+    _CACHE['exp'] = time.monotonic() + SOLAR_CACHE_TTL
+    return data
+
+
+def _get_solar():
+    """Return the solardata fields, downloading and parsing them at most once per TTL."""
+    if time.monotonic() < _CACHE['exp']:
+        return _CACHE['data']
+    return _refresh_solar()
+
+
+def _refresher():
+    """Keep the cache warm so replies never wait on hamqsl.com."""
+    while True:
+        try:
+            _refresh_solar()
+        except Exception:
+            # Keep serving the last good copy; the next pass retries
+            pass
+        time.sleep(SOLAR_REFRESH_INTERVAL)
+
+
+# Opt-in so one-off imports (tests, the CLI) don't start a polling thread
+if os.environ.get('HAMPUFF_SOLAR_REFRESH', 'false').lower() == 'true':
+    threading.Thread(target=_refresher, name='solar-refresh', daemon=True).start()
+
+
+def hampuff_data(hampuff_args):
+    hampuff_command = hampuff_args.lower()
+    if len(hampuff_command) != 8:
         return("Hampuff Length Error")
-    hp_timezone = hampuff_list[7]
-    if hp_timezone=='e' or hp_timezone=='p':
-        if hp_timezone=='e':
-            hp_local_tz = EAS
-        if hp_timezone=='p':
-            hp_local_tz = PAC
-        #return (hp_local_tz)
-    else:
+    # (1) Set the timezone
+    hp_local_tz = _TZ.get(hampuff_command[7])
+    if hp_local_tz is None:
         return ("Hampuff Timezone Unknown Error - only Pacfic (hampuffp) and Eastern (hampuffe) are supported")
+
+    SOLAR = _get_solar()
+
     # (2) Get the reported time
-    HAMQSL_UPDATE     = MY_DICT['solar']['solardata']['updated']
-    # (3) Figure out what format #2 is in
-    HAMQSL_FMT        = '%d %b %Y %H%M %Z'
-    # (4) Parse the time from #2 using the format in #3
-    HAMQSL_CUR_TIME   = datetime.datetime.strptime(HAMQSL_UPDATE, HAMQSL_FMT).replace(tzinfo=datetime.timezone.utc)
-    # (5) Convert the timezone
+    HAMQSL_UPDATE     = SOLAR['updated']
+    # (3) Parse the time from #2, which is always '%d %b %Y %H%M GMT'
+    day, month, year, hhmm, _ = HAMQSL_UPDATE.split()
+    HAMQSL_CUR_TIME   = _datetime(int(year), _MONTHS[month], int(day),
+                                  int(hhmm[:2]), int(hhmm[2:]), tzinfo=_UTC)
+    # (4) Convert the timezone
     HAMQSL_CONV_TIME  = HAMQSL_CUR_TIME.astimezone(hp_local_tz)
-    # (6)Set the output format
-    HAMQSL_OUT_FORMAT = '%a %d %b %H:%M'
-    # (7) format the time
-    HAMQSL_OUT_TIME      = datetime.datetime.strftime(HAMQSL_CONV_TIME, HAMQSL_OUT_FORMAT)
-
-    hampuff_data = "[Hampuff]\t%-s: %s\n\t%-11s= %s\n\t%-11s= %s\n\t%-11s= %s\n\t%-11s= %s\n\t%-11s= %s\n\t%-11s= %s\n\t%-11s= %s" % \
-        ("Updated", HAMQSL_OUT_TIME, "Solar Flux", SOLARFLUX, "A Index", A_INDEX, \
-            "K Index", K_INDEX, "Sunspot #", SUNSPOTS, "MUF", MUF, "XRay", XRAY, "Solar Winds", SOLARWIND)
-    return hampuff_data
\ No newline at end of file
+    # (5) Format the time as e.g. 'Thu 15 Oct 10:32', independent of locale
+    HAMQSL_OUT_TIME   = (f"{_WEEKDAYS[HAMQSL_CONV_TIME.weekday()]} {HAMQSL_CONV_TIME.day:02d} "
+                         f"{_MONTH_NAMES[HAMQSL_CONV_TIME.month - 1]} "
+                         f"{HAMQSL_CONV_TIME.hour:02d}:{HAMQSL_CONV_TIME.minute:02d}")
+
+    # (6) Get the daytime 80m-40m band conditions
+    BAND_80_40_DAY    = SOLAR['bands'].get(('80m-40m', 'day'), 'N/A')
+
+    return _REPLY_TEMPLATE.format_map({
+        'updated': HAMQSL_OUT_TIME,
+        'solar': SOLAR,
+        'band_80_40_day': BAND_80_40_DAY,
+    })